@@ -0,0 +1,32 @@
+"""
+Some modules are shared by the project trees, which are separate packages (each one imports from its own src):
+the copies must stay byte-identical, edit one and copy it over the others
+Usage: python check_shared.py (exit status 1 if a copy differs)
+"""
+
+import filecmp
+import os
+import sys
+
+# copies of the same module, paths relative to the repository root
+SHARED = [
+    ('tln_radicioni/src/normalizer.py', 'tln_dicaro/src/normalizer.py'),
+    ('tln_radicioni/src/string_table.py', 'tln_dicaro/src/string_table.py'),
+    ('tln_radicioni/src/Esercitazione3/Nasari.py', 'tln_dicaro/src/Segmentation/nasari.py'),
+]
+
+
+def main():
+    root = os.path.dirname(os.path.abspath(__file__))
+    status = 0
+    for group in SHARED:
+        first = os.path.join(root, group[0])
+        for other in group[1:]:
+            if not filecmp.cmp(first, os.path.join(root, other), shallow=False):
+                print('{0} differs from {1}'.format(other, group[0]))
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
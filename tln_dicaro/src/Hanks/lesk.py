@@ -7,9 +7,9 @@ Accuracy: 47%  (SemCor)
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
 
-import nltk
 from nltk.corpus import wordnet as wn
-from nltk.corpus import stopwords
+
+from src.normalizer import get_normalizer
 
 
 def find_synonims(sense):
@@ -34,12 +34,7 @@ def bag_of_word(sent):
     :return: bag of words
     """
 
-    stop_words = set(stopwords.words('english'))
-    punct = {',', ';', '(', ')', '{', '}', ':', '?', '!'}
-    wnl = nltk.WordNetLemmatizer()
-    tokens = nltk.word_tokenize(sent)
-    tokens = list(filter(lambda x: x not in stop_words and x not in punct, tokens))
-    return set(wnl.lemmatize(t) for t in tokens)  # siamo sicuri che non servano le ripetizioni?
+    return get_normalizer().bag_of_word(sent)
 
 
 def compute_overlap(signature, context):
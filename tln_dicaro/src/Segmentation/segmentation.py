@@ -22,84 +22,31 @@ __author__ = 'Roger Ferrod'
 from optparse import OptionParser
 import sys
 import nltk
-from nltk.corpus import stopwords
 import numpy as np
 import math
 import matplotlib.pyplot as plt
 import pandas as pd
 from scipy import signal
 
+from src.normalizer import get_normalizer, PUNCT
+from src.Segmentation.nasari import NasariStore, overlap_matrix
+
 # golden values
 separators = [60, 83, 146, 160, 366, 422, 436, 468]
 
 
-def compute_overlap(signature, context):
-    """
-    :param signature: firma del testo (BoW)
-    :param context: contesto (BoW)
-    :return: l'interesezione insiemistica tra i due insiemi
-    """
-
-    return signature & context
-
-
-def rank(x, v):
-    """
-    :param x: componente vettore
-    :param v: vettore Nasari
-    :return: rank del componente (posizione)
-    """
-
-    for i in range(len(v)):
-        if v[i] == x:
-            return i + 1
-
-
-def weighted_overlap(v1, v2):
-    """
-    Implementazione Weight Overlap (Pilehvar et al.)
-    :param v1: vettore Nasari (topic)
-    :param v2: vettore Nasari (paragrafo)
-    :return: square-rooted Weighted Overlap, 0 se non c'è sovrapposizione
-    """
-
-    # v = {"w":n, "w":n, "w":n, "w":n}
-    overlap_keys = compute_overlap(v1.keys(), v2.keys())
-
-    overlaps = list(overlap_keys)
-
-    if len(overlaps) > 0:
-        den = sum(1 / (rank(q, list(v1)) + rank(q, list(v2))) for q in overlaps)  # sum 1/(rank() + rank())
-        num = sum(list(map(lambda x: 1 / (2 * x), list(range(1, len(overlaps) + 1)))))  # sum 1/(2*i)
-
-        return den / num
-
-    return 0
-
-
 def parse_nasari():
     """
     Parsifica il file di input Nasari (rappresentazione Lexical)
-    :return: dizionario {word: {term:score}}
+    con la directory del formato binario il file viene convertito alla prima esecuzione, poi caricato in memory-map
+    :return: dizionario {word: NasariVector}
     """
 
     global options
 
-    nasari_dict = {}
-    with open(options.nasari, 'r', encoding="utf8") as file:
-        for line in file:
-            # splits = line.split(";")
-            splits = line.split("\t")
-            vector_dict = {}
-
-            for term in splits[2:options.limit]:
-                k = term.split("_")
-                if len(k) > 1:
-                    vector_dict[k[0]] = k[1]
-
-            nasari_dict[splits[1].lower()] = vector_dict
-
-    return nasari_dict
+    if options.store:
+        return NasariStore.load_or_build(options.store, options.nasari, sep="\t", limit=options.limit)
+    return NasariStore.from_text(options.nasari, sep="\t", limit=options.limit)
 
 
 def read(path):
@@ -137,16 +84,12 @@ def bag_of_word(tokens):
     :return: rappresentazione BoW del testo
     """
 
-    stop_words = set(stopwords.words('english'))
-    punct = {',', ';', '(', ')', '{', '}', ':', '?', '!', '*'}
-    wnl = nltk.WordNetLemmatizer()
-    tokens = list(filter(lambda x: x not in stop_words and x not in punct, tokens))
-    return set(wnl.lemmatize(t) for t in tokens)
+    return get_normalizer(PUNCT | {'*'}).bag_of_tokens(tokens)
 
 
 def create_vectors(tokens, nasari):
     """
-    Crea una lista di vettori Lexical Nasari (dizionaro {term:score})
+    Crea una lista di vettori Lexical Nasari (NasariVector)
     associati ad ogni termine del testo
     :param text: stringa di testo
     :param nasari: dizionario Nasari
@@ -156,7 +99,7 @@ def create_vectors(tokens, nasari):
     tokens = bag_of_word(tokens)
     vectors = []
     for word in tokens:
-        if word in nasari.keys():
+        if word in nasari:
             vectors.append(nasari[word])
 
     return vectors
@@ -173,24 +116,15 @@ def main():
     sequences = tokenize(text)
 
     # compute similarity neighbors
+    vectors = [create_vectors(s, nasari) for s in sequences]
     similarities = list(np.zeros(len(sequences)))
     for i in range(1, len(sequences) - 1):
-        prev = create_vectors(sequences[i - 1], nasari)
-        current = create_vectors(sequences[i], nasari)
-        next = create_vectors(sequences[i + 1], nasari)
-
-        # compute square root weighted overlap
-        similarity = []
-        for x in prev:
-            for w in current:
-                similarity.append(math.sqrt(weighted_overlap(x, w)))
-        left = max(similarity) if len(similarity) > 0 else 0
-
-        similarity = []
-        for x in next:
-            for w in current:
-                similarity.append(math.sqrt(weighted_overlap(x, w)))
-        right = max(similarity) if len(similarity) > 0 else 0
+        # compute square root weighted overlap (sqrt is monotonic: max of sqrt = sqrt of max)
+        similarity = overlap_matrix(vectors[i - 1], vectors[i])
+        left = math.sqrt(similarity.max()) if similarity.size > 0 else 0
+
+        similarity = overlap_matrix(vectors[i + 1], vectors[i])
+        right = math.sqrt(similarity.max()) if similarity.size > 0 else 0
 
         similarities[i] = (left + right) / 2
 
@@ -267,6 +201,9 @@ if __name__ == "__main__":
     parser.add_option("-l", "--limit", help='nasari dimensions', action="store", type="int", dest="limit",
                       default="14")
 
+    parser.add_option("-b", "--binary", help='nasari binary store directory (empty to disable)', action="store",
+                      type="string", dest="store", default="../../cache/nasari-lexical/")
+
     parser.add_option("-w", help='tokens sequence size', action="store", type="int", dest="w",
                       default="25")
 
@@ -1,130 +1,135 @@
 """
 Esercitazione Conecpt Similarity
-calcola similarità (usando 3 metriche) su coppie di termini
-calcola inoltre indici di correlazione (Pearson e Spearman)
+calcola similarità (usando 3 metriche, più 3 basate su Information Content con --ic) su coppie di termini
+calcola inoltre indici di correlazione (Pearson e Spearman) con intervalli di confidenza bootstrap
 """
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
 
+from array import array
 from optparse import OptionParser
-import matplotlib.pyplot as plt
+import numpy
 import sys
 import time
 
 from src.Esercitazione1.WordNetDriver import WordNetDriver
+from src.Esercitazione1.HypernymIndex import HypernymIndex
 from src.Esercitazione1.Metrics import Metrics
+from src.Esercitazione1.Scorer import score_couples
+from src.Esercitazione1.SimilarityCache import SimilarityCache
+from src.Esercitazione1.InformationContent import InformationContent
 from src.Esercitazione1.Indeces import *
 
 
 def parse_csv(path):
     """
     Parsifica file di input composta da coppia di termini annotati manualmente
+    Le righe vengono lette una alla volta
     :param path: percorso file di input
-    :return: [(w1, w2, gold)]
+    :return: generatore di (w1, w2, gold)
     """
-    couple_list = []
+
     with open(path, 'r') as fileCSV:
-        for line in fileCSV.readlines()[1:]:
+        next(fileCSV, None)  # intestazione
+        for line in fileCSV:
             temp = line.split(",")
             gold_value = temp[2].replace('\n', '')
-            couple_list.append((temp[0], temp[1], float(gold_value)))
-
-    return couple_list
+            yield temp[0], temp[1], float(gold_value)
 
 
 def main():
     global options
 
-    couple_list = parse_csv(options.input)
-    print(couple_list)
+    index = HypernymIndex.load_or_build(options.index) if options.index else None
+    wnd = WordNetDriver(index, options.depth_max, options.depth_cache)
 
-    wnd = WordNetDriver()
+    ic = None
+    ic_path = options.ic.format(corpus=options.ic_corpus) if options.ic else None
+    if index is not None and ic_path:
+        ic = InformationContent.load_or_build(ic_path, index, options.ic_corpus)
 
-    similarities = []  # lista di liste di similarità, una lista per ogni metrica
-    metric_obj = Metrics(wnd)
+    cache = SimilarityCache(options.cache_size, options.cache or None) if options.cache_size > 0 else None
+    metric_obj = Metrics(wnd, cache, ic)
     start_time = time.time()
     metrics = list(zip(*metric_obj.get_all()))
 
-    to_remove = []
+    # in memoria restano solo i valori numerici, necessari per gli indici di correlazione
+    golden = array('d')
+    similarities = [array('d') for _ in metrics[0]]  # lista di similarità, una per ogni metrica
+
     count = 0  # per contare le coppie di sensi totali
-    for f in metrics[0]:
-        sim_metric = []  # lista di similirtà per questa metrica
-        i = 0
-        for t in couple_list:
-            ss1 = WordNetDriver.get_synsets(t[0])
-            ss2 = WordNetDriver.get_synsets(t[1])
-            senses = [ss1, ss2]
-            maxs = []  # lista di similarita tra sensi
-            for s1 in senses[0]:
-                for s2 in senses[1]:
-                    count += 1
-                    maxs.append(f(s1, s2))
-            if len(maxs) == 0:  # parole prive di sensi (e.g nomi propri)
-                maxs = [-1]
-                to_remove.append(i)
-            sim_metric.append(max(maxs))
-            i += 1
-        similarities.append(sim_metric)
+    results = score_couples(parse_csv(options.input), metric_obj, options.jobs, options.shard_size, options.index,
+                            ic_path)
+    with open(options.output + 'Es1_Results.txt', "w") as out:
+        out.write("w1, w2 | " + ", \t".join("m" + str(m + 1) for m in range(len(similarities))) + " | gold\n")
+        for couple, maxs, n in results:
+            count += n
+            if maxs is None:  # parole prive di sensi (e.g nomi propri)
+                continue
+
+            golden.append(couple[2])
+            for m in range(len(similarities)):
+                similarities[m].append(maxs[m])
+            out.write("{0}, {1} | {2} | {3}\n".format(couple[0], couple[1],
+                                                     ", \t".join("{0:.2f}".format(x) for x in maxs), couple[2]))
 
     end_time = time.time()
     print("{0} combinazioni di sensi".format(count))
     print("{0} secondi".format(end_time - start_time))
+    if cache is not None:
+        cache.close()
 
-    for i in range(len(couple_list)):
-        if i in to_remove:
-            del couple_list[i]
-            for s in range(len(similarities)):
-                del similarities[s][i]
-
-    golden = [x[2] for x in couple_list]
-    pearson_list = []
-    spearman_list = []
-    for i in range(len(metrics[1])):
-        yy = similarities[i]
-        pearson_list.append(pearson_index(golden, yy))
-        spearman_list.append(spearman_index(golden, yy))
-        draw_plot(i, metrics[1][i], golden, yy, pearson_list[i], spearman_list[i])
-
-    with open(options.output + 'Es1_Results.txt', "w") as out:
-        out.write("w1, w2 | m1, \tm2, \tm3 | gold\n")
-        for i in range(len(couple_list)):
-            out.write("{0}, {1} | {2:.2f}, \t{3:.2f}, \t{4:.2f} | {5}\n".format(couple_list[i][0], couple_list[i][1],
-                                                                                similarities[0][i], similarities[1][i],
-                                                                                similarities[2][i],
-                                                                                couple_list[i][2],
-                                                                                )
-                      )
+    yy = numpy.column_stack(similarities)  # una colonna per metrica
+    pearson_list = pearson_index(golden, yy)
+    spearman_list = spearman_index(golden, yy)
+    pearson_ci = bootstrap_ci(golden, yy, pearson_index, options.bootstrap)
+    spearman_ci = bootstrap_ci(golden, yy, spearman_index, options.bootstrap)
+    if options.plot:
+        draw_plot(metrics[1], golden, yy, pearson_list, spearman_list)
 
     with open(options.output + 'Es1_Indeces.txt', "w") as out:
         for i in range(len(pearson_list)):
-            out.write("m" + str(i + 1) + " | Pearson Index: " + str(pearson_list[i]) + " | Spearman Index: " + str(
-                spearman_list[i]) + "\n")
+            out.write("m{0} | Pearson Index: {1} [{2:.4f}, {3:.4f}] | Spearman Index: {4} [{5:.4f}, {6:.4f}]\n".format(
+                i + 1, pearson_list[i], pearson_ci[0][i], pearson_ci[1][i],
+                spearman_list[i], spearman_ci[0][i], spearman_ci[1][i]))
 
 
-def draw_plot(id, metrics_name, list_gold_value, list_similarity, p_index_value, s_index_value):
+def draw_plot(metrics_names, list_gold_value, similarities, p_index_values, s_index_values):
     """
-    Disegna grafico dati, asse x = golden value, asse y = concept similarity
-    :param id: id figura
-    :param metrics_name: nome metrica usata
+    Disegna un'unica figura con un grafico per metrica, asse x = golden value, asse y = concept similarity
+    matplotlib viene importato (con backend non interattivo) solo se i grafici sono richiesti
+    :param metrics_names: nomi delle metriche usate
     :param list_gold_value: lista di golden value
-    :param list_similarity: lista di similarità
-    :param p_index_value: Pearson index
-    :param s_index_value: Spearman index
+    :param similarities: matrice di similarità (una colonna per metrica)
+    :param p_index_values: Pearson index (uno per metrica)
+    :param s_index_values: Spearman index (uno per metrica)
     """
 
-    fig = plt.figure(id)
-    plt.title(metrics_name)
-    p_index_value = str(p_index_value)
-    s_index_value = str(s_index_value)
-    plt.text(0.5, 0.5, 'Pearson Index = ' + p_index_value[0:6] + '\n' + 'Spearman Index = ' + s_index_value[0:6])
-    plt.plot(list_gold_value, list_similarity, 'o', color='#99ccff')
-    plt.xlabel("Gold Value")
-    plt.legend(loc='upper left')
-    plt.ylabel("Concept Similarity")
-    plt.grid(linestyle='--')
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    cols = min(3, len(metrics_names))
+    rows = -(-len(metrics_names) // cols)
+    fig, axes = plt.subplots(rows, cols, figsize=(5 * cols, 4 * rows), squeeze=False)
+
+    for i, ax in enumerate(axes.flat):
+        if i >= len(metrics_names):
+            ax.set_visible(False)
+            continue
+
+        p_index_value = str(p_index_values[i])
+        s_index_value = str(s_index_values[i])
+        ax.set_title(metrics_names[i])
+        ax.text(0.5, 0.5, 'Pearson Index = ' + p_index_value[0:6] + '\n' + 'Spearman Index = ' + s_index_value[0:6])
+        ax.plot(list_gold_value, similarities[:, i], 'o', color='#99ccff')
+        ax.set_xlabel("Gold Value")
+        ax.set_ylabel("Concept Similarity")
+        ax.grid(linestyle='--')
 
     fig.tight_layout()
-    plt.savefig(options.output + '/' + str(id) + '.png', bbox_inches='tight')
+    fig.savefig(options.output + '/Es1_Plots.png', bbox_inches='tight')
+    plt.close(fig)
 
 
 if __name__ == "__main__":
@@ -139,6 +144,39 @@ if __name__ == "__main__":
     parser.add_option("-o", "--output", help='output directory', action="store", type="string", dest="output",
                       default="../../output/Es1/")
 
+    parser.add_option("-x", "--index", help='hypernym index directory', action="store", type="string", dest="index",
+                      default="../../cache/wordnet/")
+
+    parser.add_option("--ic", help='information content table enabling the IC metrics, {corpus} is replaced by '
+                                   '--ic-corpus (e.g ../../cache/ic_{corpus}.npy, requires the nltk corpus)',
+                      action="store", type="string", dest="ic", default="")
+
+    parser.add_option("--ic-corpus", help='nltk corpus for information content', action="store", type="string",
+                      dest="ic_corpus", default="brown")
+
+    parser.add_option("-d", "--depth-max", help='WordNet max depth (skip computation)', action="store", type="int",
+                      dest="depth_max", default=None)
+
+    parser.add_option("-c", "--depth-cache", help='WordNet max depth cache file', action="store", type="string",
+                      dest="depth_cache", default="../../cache/depth_max.json")
+
+    parser.add_option("-j", "--jobs", help='number of worker processes', action="store", type="int", dest="jobs",
+                      default="1")
+
+    parser.add_option("-s", "--shard-size", help='word pairs per shard', action="store", type="int",
+                      dest="shard_size", default=None)
+
+    parser.add_option("--cache", help='similarity cache database', action="store", type="string", dest="cache",
+                      default="../../cache/similarity.sqlite")
+
+    parser.add_option("--cache-size", help='similarity cache size (0 to disable)', action="store", type="int",
+                      dest="cache_size", default="100000")
+
+    parser.add_option("-b", "--bootstrap", help='bootstrap samples for confidence intervals', action="store",
+                      type="int", dest="bootstrap", default="1000")
+
+    parser.add_option("--no-plot", help='skip plots', action="store_false", dest="plot", default=True)
+
     (options, args) = parser.parse_args()
 
     if options.input is None:
@@ -0,0 +1,237 @@
+"""
+Il seguente modulo contiene l'indice precalcolato della chiusura degli iperonimi di WordNet
+L'indice viene costruito una sola volta, salvato su disco e caricato in memory-map nelle esecuzioni successive
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import os
+import numpy as np
+from nltk.corpus import wordnet as wn
+
+from src.string_table import read_manifest, write_manifest, remove_manifest
+from src.wordnet_files import wordnet_key
+
+
+class HypernymIndex:
+    """
+    Chiusura degli iperonimi di ogni synset di WordNet in formato CSR
+    (gli antenati del synset i sono ancestors[indptr[i]:indptr[i + 1]])
+
+    Attributes:
+        names: lista dei nomi dei synset (l'id di un synset è la sua posizione)
+        ids: dizionario {nome synset: id}
+        indptr: offset delle righe CSR
+        ancestors: id degli antenati di ogni synset (ordinati, incluso il synset stesso)
+        hops: numero minimo di archi tra il synset e l'antenato corrispondente
+        min_depth: profondità minima di ogni synset (lunghezza minima dei path - 1)
+        max_depth: profondità massima di ogni synset (lunghezza massima dei path - 1)
+    """
+
+    files = ['indptr', 'ancestors', 'hops', 'min_depth', 'max_depth']
+
+    def __init__(self, names, indptr, ancestors, hops, min_depth, max_depth):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.indptr = indptr
+        self.ancestors = ancestors
+        self.hops = hops
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+
+    @classmethod
+    def build(cls):
+        """
+        Costruisce l'indice visitando tutti i synset di WordNet
+        (iperonimi e iperonimi di istanza, come in hypernym_paths)
+        :return: HypernymIndex
+        """
+
+        closures = {}  # {nome synset: {nome antenato: archi minimi}}
+        depths = {}  # {nome synset: (profondità minima, profondità massima)}
+
+        def visit(synset):
+            name = synset.name()
+            if name in closures:
+                return closures[name]
+
+            closure = {name: 0}
+            parents = synset.hypernyms() + synset.instance_hypernyms()
+            for parent in parents:
+                for k, v in visit(parent).items():
+                    if k not in closure or v + 1 < closure[k]:
+                        closure[k] = v + 1
+
+            if len(parents) == 0:
+                depths[name] = (0, 0)
+            else:
+                parents_depths = [depths[p.name()] for p in parents]
+                depths[name] = (1 + min(d[0] for d in parents_depths), 1 + max(d[1] for d in parents_depths))
+            closures[name] = closure
+            return closure
+
+        names = []
+        for synset in wn.all_synsets():
+            visit(synset)
+            names.append(synset.name())
+        names = sorted(set(names))
+        ids = {name: i for i, name in enumerate(names)}
+
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        ancestors = []
+        hops = []
+        for i, name in enumerate(names):
+            row = sorted((ids[k], v) for k, v in closures[name].items())
+            ancestors.extend(x[0] for x in row)
+            hops.extend(x[1] for x in row)
+            indptr[i + 1] = len(ancestors)
+
+        min_depth = np.array([depths[name][0] for name in names], dtype=np.int16)
+        max_depth = np.array([depths[name][1] for name in names], dtype=np.int16)
+
+        return cls(names, indptr, np.array(ancestors, dtype=np.int32), np.array(hops, dtype=np.int16),
+                   min_depth, max_depth)
+
+    def save(self, path):
+        """
+        Salva l'indice su disco (un file .npy per array e la lista dei nomi)
+        :param path: directory di destinazione
+        """
+
+        os.makedirs(path, exist_ok=True)
+        for f in self.files:
+            np.save(os.path.join(path, f + '.npy'), getattr(self, f))
+        with open(os.path.join(path, 'names.txt'), 'w', encoding='utf-8') as out:
+            out.write('\n'.join(self.names))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Carica l'indice in memory-map (le pagine sono condivise tra processi)
+        :param path: directory dell'indice
+        :return: HypernymIndex
+        """
+
+        with open(os.path.join(path, 'names.txt'), 'r', encoding='utf-8') as file:
+            names = file.read().split('\n')
+        arrays = [np.load(os.path.join(path, f + '.npy'), mmap_mode='r') for f in cls.files]
+        return cls(names, *arrays)
+
+    @classmethod
+    def load_or_build(cls, path):
+        """
+        Il manifest della directory registra la versione di WordNet (wordnet_key):
+        se non corrisponde l'indice viene ricostruito
+        :param path: directory dell'indice
+        :return: l'indice salvato in path, se non esiste (o è di un altro WordNet) viene costruito e salvato
+        """
+
+        manifest = {'wordnet': wordnet_key()}
+        if read_manifest(path) == manifest:
+            return cls.load(path)
+
+        os.makedirs(path, exist_ok=True)
+        remove_manifest(path)
+        index = cls.build()
+        index.save(path)
+        write_manifest(path, manifest)
+        return index
+
+    def synset_id(self, synset):
+        """
+        :param synset: Synset di WordNet
+        :return: id del synset nell'indice
+        """
+
+        return self.ids[synset.name()]
+
+    def synset(self, i):
+        """
+        :param i: id del synset
+        :return: Synset corrispondente
+        """
+
+        return wn.synset(self.names[i])
+
+    def closure(self, i):
+        """
+        :param i: id del synset
+        :return: (id antenati, archi minimi verso ogni antenato)
+        """
+
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.ancestors[start:end], self.hops[start:end]
+
+    def hops_to(self, i, ancestor):
+        """
+        :param i: id del synset
+        :param ancestor: id dell'antenato
+        :return: numero minimo di archi tra il synset e l'antenato, None se non è un antenato
+        """
+
+        ancestors, hops = self.closure(i)
+        pos = np.searchsorted(ancestors, ancestor)
+        if pos < len(ancestors) and ancestors[pos] == ancestor:
+            return int(hops[pos])
+        return None
+
+    def lcs_distance(self, i, j):
+        """
+        L'lcs è l'antenato comune con profondità massima più alta
+        (a parità di profondità quello con id minore)
+        :param i: id synset 1
+        :param j: id synset 2
+        :return: (id lcs, distanza tra i due synset passando per lcs), (-1, -1) se non esiste lcs
+        """
+
+        ancestors1, hops1 = self.closure(i)
+        ancestors2, hops2 = self.closure(j)
+        common, idx1, idx2 = np.intersect1d(ancestors1, ancestors2, assume_unique=True, return_indices=True)
+        if len(common) == 0:
+            return -1, -1
+
+        best = int(np.argmax(self.max_depth[common]))
+        return int(common[best]), int(hops1[idx1[best]]) + int(hops2[idx2[best]])
+
+    def gather(self, ids):
+        """
+        :param ids: array di id
+        :return: (posizione in ids, id antenato, archi minimi) per ogni antenato di ogni synset di ids,
+                 ordinati per posizione e poi per id antenato
+        """
+
+        ids = np.asarray(ids, dtype=np.int64)
+        starts = np.asarray(self.indptr)[ids]
+        lengths = np.asarray(self.indptr)[ids + 1] - starts
+        pos = np.repeat(np.arange(len(ids)), lengths)
+        entries = np.repeat(starts, lengths) + (np.arange(len(pos)) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        return pos, np.asarray(self.ancestors)[entries], np.asarray(self.hops)[entries]
+
+    def lcs_distance_batch(self, ids1, ids2):
+        """
+        Come lcs_distance per tutte le coppie, con un unico join sugli array degli antenati
+        (chiave = indice della coppia * numero synset + id antenato)
+        :param ids1: array di id (primo synset di ogni coppia)
+        :param ids2: array di id (secondo synset di ogni coppia)
+        :return: (array id lcs, array distanze), -1 dove non esiste lcs
+        """
+
+        n = len(self.names)
+        pos1, ancestors1, hops1 = self.gather(ids1)
+        pos2, ancestors2, hops2 = self.gather(ids2)
+        key1 = pos1 * n + ancestors1
+        key2 = pos2 * n + ancestors2
+        common, idx1, idx2 = np.intersect1d(key1, key2, assume_unique=True, return_indices=True)
+
+        pairs = common // n
+        ancestors = common % n
+        depth = np.asarray(self.max_depth)[ancestors]
+        # per ogni coppia l'antenato comune con profondità massima più alta (a parità quello con id minore)
+        order = np.lexsort((ancestors, -depth.astype(np.int64), pairs))
+        first = order[np.concatenate(([True], pairs[order][1:] != pairs[order][:-1]))] if len(order) > 0 else order
+
+        lcs = np.full(len(ids1), -1, dtype=np.int64)
+        dist = np.full(len(ids1), -1, dtype=np.int64)
+        lcs[pairs[first]] = ancestors[first]
+        dist[pairs[first]] = hops1[idx1[first]].astype(np.int64) + hops2[idx2[first]]
+        return lcs, dist
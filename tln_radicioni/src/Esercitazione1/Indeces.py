@@ -1,5 +1,7 @@
 """
 Il seguente modulo contiene le implementazione degli indici di correlazione
+Tutti gli indici lavorano lungo il primo asse: x è il vettore dei golden value (n),
+y può essere un vettore (n) oppure una matrice (n x k, una colonna per metrica)
 """
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
@@ -10,29 +12,30 @@ import numpy
 def pearson_index(x, y):
     """
     :param x: golden value
-    :param y: lista similarità
-    :return: indice di correlazione di Pearson
+    :param y: lista similarità (oppure matrice, una colonna per metrica)
+    :return: indice di correlazione di Pearson (uno per colonna di y)
     """
 
-    mu_x = numpy.mean(x)
-    mu_y = numpy.mean(y)
-    std_dev_x = numpy.std(x)
-    std_dev_y = numpy.std(y)
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    while x.ndim < y.ndim:
+        x = x[..., numpy.newaxis]
 
-    modified__x = [elem - mu_x for elem in x]
-    modified__y = [elem - mu_y for elem in y]
+    modified__x = x - x.mean(axis=0)
+    modified__y = y - y.mean(axis=0)
 
-    num = numpy.mean(numpy.multiply(modified__x, modified__y))
-    denum = std_dev_x * std_dev_y
+    num = (modified__x * modified__y).sum(axis=0)
+    denum = numpy.sqrt((modified__x ** 2).sum(axis=0) * (modified__y ** 2).sum(axis=0))
 
-    return num / denum
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return num / denum
 
 
 def spearman_index(x, y):
     """
     :param x: golden value
-    :param y: lista similarità
-    :return: indice di correlazione di Spearman
+    :param y: lista similarità (oppure matrice, una colonna per metrica)
+    :return: indice di correlazione di Spearman (uno per colonna di y)
     """
 
     rank__x = define_rank(x)
@@ -43,12 +46,55 @@ def spearman_index(x, y):
 
 def define_rank(x):
     """
-    :param x: vettore numerico
-    :return: lista di rank corrispondenti al vettore di input (secondo l'ordine di input)
+    In caso di valori uguali viene assegnato il rank medio
+    :param x: vettore (o matrice) numerico
+    :return: rank (a partire da 1) di ogni elemento, calcolati lungo il primo asse e nell'ordine di input
     """
 
-    x_couple = [(x[i], i) for i in range(len(x))]
+    x = numpy.asarray(x, dtype=numpy.float64)
+    n = x.shape[0]
+    order = numpy.argsort(x, axis=0, kind='mergesort')
+    x_sorted = numpy.take_along_axis(x, order, axis=0)
+    positions = numpy.broadcast_to(numpy.arange(n).reshape((n,) + (1,) * (x.ndim - 1)), x.shape)
 
-    x_couple_sorted = sorted(x_couple, key=lambda x: x[0])
-    list_result = [y for (x, y) in x_couple_sorted]
-    return list_result
+    # inizio e fine di ogni gruppo di valori uguali (posizioni nel vettore ordinato)
+    first = numpy.ones(x.shape, dtype=bool)
+    first[1:] = x_sorted[1:] != x_sorted[:-1]
+    last = numpy.ones(x.shape, dtype=bool)
+    last[:-1] = first[1:]
+    start = numpy.maximum.accumulate(numpy.where(first, positions, 0), axis=0)
+    end = numpy.flip(numpy.minimum.accumulate(numpy.flip(numpy.where(last, positions, n - 1), axis=0), axis=0), axis=0)
+
+    ranks = numpy.empty(x.shape, dtype=numpy.float64)
+    numpy.put_along_axis(ranks, order, (start + end) / 2 + 1, axis=0)
+    return ranks
+
+
+def bootstrap_ci(x, y, index=pearson_index, samples=1000, alpha=0.05, seed=None, block=10 ** 7):
+    """
+    Intervallo di confidenza bootstrap (percentile) dell'indice di correlazione
+    I ricampionamenti vengono valutati insieme, a blocchi di al più 'block' valori
+    :param x: golden value
+    :param y: lista similarità (oppure matrice, una colonna per metrica)
+    :param index: indice di correlazione (pearson_index, spearman_index)
+    :param samples: numero di ricampionamenti
+    :param alpha: livello di significatività (0.05 = intervallo al 95%)
+    :param seed: seme del generatore casuale
+    :param block: numero massimo di valori per blocco di ricampionamenti
+    :return: (estremi inferiori, estremi superiori), uno per colonna di y
+    """
+
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    n = x.shape[0]
+    rng = numpy.random.default_rng(seed)
+
+    step = max(1, block // (n * (y.size // n)))
+    values = []
+    for i in range(0, samples, step):
+        idx = rng.integers(0, n, size=(n, min(step, samples - i)))  # una colonna per ricampionamento
+        values.append(index(x[idx], y[idx]))
+    values = numpy.concatenate(values, axis=0)
+
+    low, high = numpy.nanpercentile(values, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    return low, high
@@ -0,0 +1,130 @@
+"""
+Il seguente modulo contiene la tabella di Information Content dei synset di WordNet
+La tabella viene calcolata una sola volta a partire dalle frequenze di un corpus
+ed è un array compatto indicizzato per id del synset (lo stesso id dell'HypernymIndex)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import json
+import os
+import numpy as np
+from nltk.corpus import wordnet as wn
+
+from src.wordnet_files import wordnet_key
+
+
+class InformationContent:
+    """
+    Attributes:
+        ic: array float32, IC = -log(p(synset)) per ogni id di synset
+        ic_max: IC massimo (usato per normalizzare Resnik)
+        corpus: nome del corpus da cui è stata calcolata la tabella (None se non noto)
+        wordnet: versione di WordNet dell'HypernymIndex a cui la tabella è allineata (None se non nota)
+    """
+
+    def __init__(self, ic, corpus=None, wordnet=None):
+        self.ic = ic
+        self.ic_max = float(np.max(ic))
+        self.corpus = corpus
+        self.wordnet = wordnet
+
+    @classmethod
+    def build(cls, index, words, smoothing=1.0):
+        """
+        Calcola le frequenze dei concetti (Resnik, 1995): ogni occorrenza di una parola
+        viene divisa equamente tra i suoi sensi e propagata a tutti gli antenati (una volta per antenato)
+        :param index: HypernymIndex
+        :param words: iterabile di parole del corpus
+        :param smoothing: frequenza iniziale di ogni synset (evita IC infinito per i synset mai osservati)
+        :return: InformationContent
+        """
+
+        counts = np.full(len(index.names), smoothing, dtype=np.float64)
+        senses = {}  # {parola: id dei sensi}
+        for word in words:
+            word = word.lower()
+            if word not in senses:
+                senses[word] = [index.ids[s.name()] for s in wn.synsets(word)]
+            ids = senses[word]
+            if len(ids) > 0:
+                counts[ids] += 1 / len(ids)
+
+        # frequenza di un concetto = somma delle frequenze dei synset di cui è antenato
+        lengths = np.diff(np.asarray(index.indptr))
+        freq = np.zeros(len(index.names), dtype=np.float64)
+        np.add.at(freq, np.asarray(index.ancestors), np.repeat(counts, lengths))
+
+        # probabilità rispetto al totale della part of speech (s = aggettivi satellite)
+        pos = np.array([name.rsplit('.', 2)[1].replace('s', 'a') for name in index.names])
+        totals = {p: counts[pos == p].sum() for p in np.unique(pos)}
+        total = np.array([totals[p] for p in pos])
+
+        return cls((-np.log(freq / total)).astype(np.float32))
+
+    @classmethod
+    def from_corpus(cls, index, corpus='brown'):
+        """
+        :param index: HypernymIndex
+        :param corpus: nome di un corpus di nltk (e.g brown, semcor)
+        :return: InformationContent calcolato sulle parole del corpus
+        """
+
+        import nltk.corpus
+        ic = cls.build(index, getattr(nltk.corpus, corpus).words())
+        ic.corpus = corpus
+        ic.wordnet = wordnet_key()
+        return ic
+
+    @staticmethod
+    def manifest(path):
+        """
+        :param path: file .npy della tabella
+        :return: file json con corpus, numero di synset e versione di WordNet della tabella
+        """
+
+        return os.path.splitext(path)[0] + '.json'
+
+    def save(self, path):
+        """
+        :param path: file .npy di destinazione
+        """
+
+        path_dir = os.path.dirname(path)
+        if path_dir != '':
+            os.makedirs(path_dir, exist_ok=True)
+        np.save(path, self.ic)
+        with open(self.manifest(path), 'w', encoding='utf-8') as out:
+            json.dump({'corpus': self.corpus, 'synsets': len(self.ic), 'wordnet': self.wordnet}, out)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: file .npy della tabella (caricato in memory-map)
+        :return: InformationContent
+        """
+
+        manifest = {}
+        if os.path.exists(cls.manifest(path)):
+            with open(cls.manifest(path), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        return cls(np.load(path, mmap_mode='r'), manifest.get('corpus'), manifest.get('wordnet'))
+
+    @classmethod
+    def load_or_build(cls, path, index, corpus='brown'):
+        """
+        La tabella è allineata agli id dell'HypernymIndex: viene ricalcolata se il numero di synset
+        o la versione di WordNet non corrispondono (e.g indice ricostruito)
+        :return: la tabella salvata in path, se non esiste (o è stata calcolata su un altro corpus o un altro indice)
+                 viene calcolata sul corpus e salvata
+        """
+
+        if os.path.exists(path):
+            ic = cls.load(path)
+            if ic.corpus == corpus and len(ic.ic) == len(index.names) and ic.wordnet == wordnet_key():
+                return ic
+            del ic  # rilascia il memory-map prima di sovrascrivere il file
+
+        ic = cls.from_corpus(index, corpus)
+        ic.save(path)
+        return ic
@@ -1,15 +1,30 @@
 """
 Il seguente modulo contiene le implementazioni delle metriche usate per il calcolo della similarità
+Le metriche basate su Information Content (Resnik, Lin, Jiang & Conrath) sono disponibili
+se viene fornita una tabella InformationContent (richiede l'HypernymIndex)
 """
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
 
 from math import log
+import numpy as np
 
 
 class Metrics:
-    def __init__(self, wnd):
+    def __init__(self, wnd, cache=None, ic=None):
         self.wnd = wnd
+        self.cache = cache
+        self.ic = ic
+        self.namespaced = False  # namespace della cache impostato (al primo accesso, richiede depth_max)
+
+    def namespace(self):
+        """
+        :return: identificativo della configurazione delle metriche (usato come namespace della cache)
+        """
+
+        index = 'index' if self.wnd.index is not None else 'paths'  # a parità di profondità l'lcs può differire
+        ic = self.ic.corpus if self.ic is not None else ''
+        return '{0}|{1}|{2}|{3}'.format(self.wnd.depth_max, ','.join(m[1] for m in self.get_all()), index, ic)
 
     def wu_palmer_metric(self, synset1, synset2):
         lcs = self.wnd.lowest_common_subsumer(synset1, synset2)
@@ -42,6 +57,137 @@ class Metrics:
             res = -(log((len_s1_s2 / (2 * max_depth)), 10))
         return (res / (log(2 * self.wnd.depth_max + 1, 10))) * 10
 
+    def resnik_metric(self, synset1, synset2):
+        return self.compute_batch([(synset1, synset2)])[0, 3]
+
+    def lin_metric(self, synset1, synset2):
+        return self.compute_batch([(synset1, synset2)])[0, 4]
+
+    def jiang_conrath_metric(self, synset1, synset2):
+        return self.compute_batch([(synset1, synset2)])[0, 5]
+
+    def synset_ids(self, pairs):
+        """
+        :param pairs: lista di coppie di synset [(s1, s2)]
+        :return: (array id primo synset, array id secondo synset) nell'HypernymIndex
+        """
+
+        index = self.wnd.index
+        ids1 = np.array([index.synset_id(p[0]) for p in pairs], dtype=np.int64)
+        ids2 = np.array([index.synset_id(p[1]) for p in pairs], dtype=np.int64)
+        return ids1, ids2
+
+    def lcs_depth_distance(self, pairs):
+        """
+        Calcola una sola volta per coppia l'lcs, la sua profondità e la distanza tra i due sensi
+        :param pairs: lista di coppie di synset [(s1, s2)]
+        :return: (array id lcs oppure None se non c'è l'indice, array profondità lcs, array distanze),
+                 -1 dove non esiste lcs
+        """
+
+        index = self.wnd.index
+        if index is not None:
+            ids1, ids2 = self.synset_ids(pairs)
+            lcs, dist = index.lcs_distance_batch(ids1, ids2)
+            depth_lcs = np.where(lcs >= 0, np.asarray(index.min_depth)[lcs] + 1, -1)
+            return lcs, depth_lcs, dist
+
+        depth_lcs = np.full(len(pairs), -1, dtype=np.int64)
+        dist = np.full(len(pairs), -1, dtype=np.int64)
+        for k, (synset1, synset2) in enumerate(pairs):
+            lcs = self.wnd.lowest_common_subsumer(synset1, synset2)
+            if lcs is not None:
+                depth_lcs[k] = self.wnd.depth_path(lcs, lcs)
+                # depth_path(s, lcs) = depth_path(lcs, lcs) + archi da s a lcs
+                dist[k] = self.wnd.depth_path(synset1, lcs) + self.wnd.depth_path(synset2, lcs) - 2 * depth_lcs[k]
+        return None, depth_lcs, dist
+
+    def score_batch(self, pairs):
+        """
+        Calcola tutte le metriche su una lista di coppie di sensi,
+        le coppie presenti in cache non vengono ricalcolate
+        :param pairs: lista di coppie di synset [(s1, s2)]
+        :return: matrice numpy (coppie x metriche), colonne nell'ordine di get_all()
+        """
+
+        if self.cache is None:
+            return self.compute_batch(pairs)
+
+        if not self.namespaced:
+            self.cache.namespace = self.namespace()
+            self.namespaced = True
+
+        scores = [self.cache.get(p[0], p[1]) for p in pairs]
+        missing = [k for k in range(len(pairs)) if scores[k] is None]
+        if len(missing) > 0:
+            computed = self.compute_batch([pairs[k] for k in missing])
+            for k, row in zip(missing, computed.tolist()):
+                scores[k] = row
+                self.cache.put(pairs[k][0], pairs[k][1], row)
+
+        return np.array(scores, dtype=np.float64).reshape(len(pairs), -1)
+
+    def compute_batch(self, pairs):
+        """
+        Calcola tutte le metriche su una lista di coppie di sensi,
+        lcs e distanza sono calcolati una sola volta per coppia e condivisi tra le metriche
+        :param pairs: lista di coppie di synset [(s1, s2)]
+        :return: matrice numpy (coppie x metriche), colonne nell'ordine di get_all()
+        """
+
+        lcs, depth_lcs, dist = self.lcs_depth_distance(pairs)
+        found = depth_lcs >= 0
+        depth_lcs = depth_lcs.astype(np.float64)
+        dist = dist.astype(np.float64)
+        max_depth = self.wnd.depth_max
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wu_palmer = (2 * depth_lcs) / (2 * depth_lcs + dist) * 10
+
+            shortest_path = (2 * max_depth - dist) / 40 * 10
+
+            length = np.where(dist == 0, 1, dist)
+            den = np.where(dist == 0, 2 * max_depth + 1, 2 * max_depth)
+            leakcock_chodorow = -np.log10(length / den) / log(2 * max_depth + 1, 10) * 10
+
+        columns = [wu_palmer, shortest_path, leakcock_chodorow]
+        if self.ic is not None:
+            columns += self.ic_columns(pairs, lcs)
+
+        scores = np.stack(columns, axis=1)
+        scores[~found] = 0
+        return scores
+
+    def ic_columns(self, pairs, lcs):
+        """
+        Metriche basate su Information Content, lette dalla tabella precalcolata
+        :param pairs: lista di coppie di synset [(s1, s2)]
+        :param lcs: array id lcs (da lcs_depth_distance)
+        :return: [Resnik, Lin, Jiang & Conrath], normalizzate in [0, 10]
+        """
+
+        table = np.asarray(self.ic.ic, dtype=np.float64)
+        ids1, ids2 = self.synset_ids(pairs)
+        ic1 = table[ids1]
+        ic2 = table[ids2]
+        ic_lcs = table[lcs]  # i valori con lcs = -1 vengono azzerati in compute_batch
+
+        resnik = ic_lcs / self.ic.ic_max * 10
+
+        den = ic1 + ic2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lin = np.where(den > 0, 2 * ic_lcs / den, 1) * 10
+
+        # distanza di Jiang & Conrath, trasformata in similarità limitata: 1 / (1 + d)
+        jcn_distance = np.maximum(ic1 + ic2 - 2 * ic_lcs, 0)
+        jiang_conrath = 1 / (1 + jcn_distance) * 10
+
+        return [resnik, lin, jiang_conrath]
+
     def get_all(self):
-        return [(self.wu_palmer_metric, "Wu & Palmer"), (self.shortest_path_metric, "Shortest Path"),
-                (self.leakcock_chodorow_metric, "Leakcock & Chodorow")]
+        metrics = [(self.wu_palmer_metric, "Wu & Palmer"), (self.shortest_path_metric, "Shortest Path"),
+                   (self.leakcock_chodorow_metric, "Leakcock & Chodorow")]
+        if self.ic is not None:
+            metrics += [(self.resnik_metric, "Resnik"), (self.lin_metric, "Lin"),
+                        (self.jiang_conrath_metric, "Jiang & Conrath")]
+        return metrics
@@ -0,0 +1,151 @@
+"""
+Il seguente modulo contiene l'esecutore parallelo per il calcolo della similarità su coppie di termini
+Le coppie vengono suddivise in shard e distribuite su un pool di processi;
+ogni processo carica in memory-map lo stesso HypernymIndex (pagine condivise tra processi)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+import time
+
+from src.Esercitazione1.WordNetDriver import WordNetDriver
+from src.Esercitazione1.HypernymIndex import HypernymIndex
+from src.Esercitazione1.Metrics import Metrics
+from src.Esercitazione1.SimilarityCache import SimilarityCache
+from src.Esercitazione1.InformationContent import InformationContent
+from src.wordnet_files import reset_wordnet_files
+
+_metrics = None  # oggetto Metrics del processo worker
+
+
+def init_worker(index_path, ic_path, depth_max, depth_cache, cache_path, cache_size):
+    """
+    Inizializza il processo worker caricando l'indice degli iperonimi
+    :param index_path: directory dell'indice (None per non usarlo)
+    :param ic_path: file della tabella di Information Content (None per non usarla)
+    :param depth_max: profondità massima di WordNet (None per ricavarla)
+    :param depth_cache: file di cache della profondità massima
+    :param cache_path: database della cache delle similarità (None per non renderla persistente)
+    :param cache_size: dimensione della cache delle similarità (None per non usarla)
+    """
+
+    global _metrics
+
+    reset_wordnet_files()  # i file di WordNet ereditati dal padre (fork) condividono l'offset di lettura
+    index = HypernymIndex.load(index_path) if index_path else None
+    ic = InformationContent.load(ic_path) if ic_path else None
+    cache = SimilarityCache(cache_size, cache_path) if cache_size is not None else None
+    _metrics = Metrics(WordNetDriver(index, depth_max, depth_cache), cache, ic)
+
+
+def score_couple(metric_obj, couple):
+    """
+    :param metric_obj: oggetto Metrics
+    :param couple: (w1, w2, gold)
+    :return: (massime similarità, una per metrica, None se una parola è priva di sensi; numero di coppie di sensi)
+    """
+
+    ss1 = WordNetDriver.get_synsets(couple[0])
+    ss2 = WordNetDriver.get_synsets(couple[1])
+    pairs = [(s1, s2) for s1 in ss1 for s2 in ss2]  # coppie di sensi
+    if len(pairs) == 0:  # parole prive di sensi (e.g nomi propri)
+        return None, 0
+
+    return list(metric_obj.score_batch(pairs).max(axis=0)), len(pairs)
+
+
+def score_shard(shard, metric_obj=None):
+    """
+    :param shard: (id shard, lista di coppie)
+    :param metric_obj: oggetto Metrics (default quello del processo worker)
+    :return: (id shard, lista di (coppia, risultati di score_couple), coppie di sensi, secondi, hit e miss della cache)
+    """
+
+    if metric_obj is None:
+        metric_obj = _metrics
+
+    cache = metric_obj.cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    start_time = time.time()
+    results = [(couple,) + score_couple(metric_obj, couple) for couple in shard[1]]
+    count = sum(r[2] for r in results)
+    if cache is not None:
+        cache.flush()
+        hits, misses = cache.hits - hits, cache.misses - misses
+
+    return shard[0], results, count, time.time() - start_time, hits, misses
+
+
+def report(shard_id, count, elapsed, hits, misses):
+    """
+    Stampa le statistiche di uno shard
+    """
+
+    line = "shard {0}: {1} combinazioni di sensi, {2} secondi".format(shard_id, count, elapsed)
+    if hits + misses > 0:
+        line += " (cache: {0} hit, {1} miss)".format(hits, misses)
+    print(line)
+
+
+def make_shards(couples, shard_size):
+    """
+    Suddivide lo stream di coppie in shard, senza leggerlo tutto in memoria
+    :param couples: iterabile di coppie
+    :param shard_size: numero di coppie per shard
+    :return: generatore di (id shard, lista di coppie)
+    """
+
+    couples = iter(couples)
+    shard_id = 0
+    shard = list(islice(couples, shard_size))
+    while len(shard) > 0:
+        yield shard_id, shard
+        shard_id += 1
+        shard = list(islice(couples, shard_size))
+
+
+def score_couples(couples, metric_obj, processes=1, shard_size=None, index_path=None, ic_path=None):
+    """
+    Calcola la similarità delle coppie di termini, restituendo i risultati nell'ordine di input
+    Le coppie vengono lette in modo lazy: in memoria restano al più 2 shard per processo
+    :param couples: iterabile di coppie [(w1, w2, gold)]
+    :param metric_obj: oggetto Metrics (usato se processes = 1, altrimenti ne viene letta la configurazione)
+    :param processes: numero di processi
+    :param shard_size: numero di coppie per shard (default: 4 shard per processo se la lunghezza è nota,
+                       altrimenti 64, così anche uno stream corto viene distribuito su tutti i processi)
+    :param index_path: directory dell'HypernymIndex da caricare nei worker
+    :param ic_path: file della tabella di Information Content da caricare nei worker
+    :return: generatore di (coppia, similarità, coppie di sensi) come in score_couple, uno per coppia
+    """
+
+    if shard_size is None:
+        shard_size = max(1, -(-len(couples) // (processes * 4))) if hasattr(couples, '__len__') else 64
+    shards = make_shards(couples, shard_size)
+
+    if processes <= 1:
+        for shard in shards:
+            shard_id, shard_results, *stats = score_shard(shard, metric_obj)
+            report(shard_id, *stats)
+            yield from shard_results
+        return
+
+    wnd = metric_obj.wnd
+    cache = metric_obj.cache
+    cache_args = (cache.path, cache.maxsize) if cache is not None else (None, None)
+    init_args = (index_path, ic_path if metric_obj.ic is not None else None, wnd.depth_max, wnd.cache) + cache_args
+    with Pool(processes, initializer=init_worker, initargs=init_args) as pool:
+        pending = deque()  # shard in esecuzione, nell'ordine di input
+        for shard in shards:
+            pending.append(pool.apply_async(score_shard, (shard,)))
+            if len(pending) >= 2 * processes:
+                shard_id, shard_results, *stats = pending.popleft().get()
+                report(shard_id, *stats)
+                yield from shard_results
+
+        while len(pending) > 0:
+            shard_id, shard_results, *stats = pending.popleft().get()
+            report(shard_id, *stats)
+            yield from shard_results
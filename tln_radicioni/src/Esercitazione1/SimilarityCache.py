@@ -0,0 +1,113 @@
+"""
+Il seguente modulo contiene la cache delle similarità tra coppie di sensi
+La cache in memoria è limitata (politica LRU) e può essere resa persistente su un database SQLite
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+
+
+class SimilarityCache:
+    """
+    Cache {(s1, s2): [similarità per ogni metrica]}, le chiavi sono indipendenti dall'ordine della coppia
+
+    Attributes:
+        maxsize: numero massimo di coppie mantenute in memoria
+        path: percorso del database SQLite (None se la cache non è persistente)
+        namespace: identifica la configurazione delle metriche (valori calcolati con configurazioni diverse non si mescolano)
+        entries: coppie in memoria, in ordine di utilizzo (la prima è la meno recente)
+        pending: coppie calcolate e non ancora salvate su disco
+        hits: numero di coppie trovate in cache
+        misses: numero di coppie non trovate in cache
+    """
+
+    def __init__(self, maxsize=100000, path=None, namespace=''):
+        self.maxsize = maxsize
+        self.path = path
+        self.namespace = namespace
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+
+        if path is not None:
+            cache_dir = os.path.dirname(path)
+            if cache_dir != '':
+                os.makedirs(cache_dir, exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=60)
+            self.db.execute('CREATE TABLE IF NOT EXISTS similarity '
+                            '(namespace TEXT, s1 TEXT, s2 TEXT, scores TEXT, PRIMARY KEY (namespace, s1, s2))')
+            self.db.commit()
+
+    @staticmethod
+    def key(synset1, synset2):
+        """
+        :return: chiave della coppia di sensi, indipendente dall'ordine
+        """
+
+        n1 = synset1.name()
+        n2 = synset2.name()
+        return (n1, n2) if n1 <= n2 else (n2, n1)
+
+    def get(self, synset1, synset2):
+        """
+        :return: similarità della coppia, None se non presente in cache
+        """
+
+        key = self.key(synset1, synset2)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        if self.db is not None:
+            row = self.db.execute('SELECT scores FROM similarity WHERE namespace = ? AND s1 = ? AND s2 = ?',
+                                  (self.namespace,) + key).fetchone()
+            if row is not None:
+                self.hits += 1
+                scores = json.loads(row[0])
+                self.insert(key, scores)
+                return scores
+
+        self.misses += 1
+        return None
+
+    def put(self, synset1, synset2, scores):
+        """
+        :param scores: lista di similarità della coppia, una per metrica
+        """
+
+        key = self.key(synset1, synset2)
+        self.insert(key, scores)
+        if self.db is not None:
+            self.pending[key] = scores
+
+    def insert(self, key, scores):
+        self.entries[key] = scores
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)  # elimina la coppia usata meno di recente
+
+    def flush(self):
+        """
+        Salva su disco le coppie calcolate dall'ultimo salvataggio
+        """
+
+        if self.db is None or len(self.pending) == 0:
+            return
+
+        rows = [(self.namespace,) + k + (json.dumps(v),) for k, v in self.pending.items()]
+        self.db.executemany('INSERT OR REPLACE INTO similarity VALUES (?, ?, ?, ?)', rows)
+        self.db.commit()
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -1,18 +1,66 @@
 """
 La seguente classe implementa il driver per accedere alla risorsa WordNet
-Nel costruttore viene eseguito il calcolo della profondità massima del grafo,
-in modo da non doverla richiedere in futuro (l'operazione è molto onerosa)
+La profondità massima del grafo viene calcolata solo al primo utilizzo (l'operazione è molto onerosa)
+e salvata in una cache su disco, indicizzata per versione di WordNet;
+in alternativa può essere fornita esplicitamente al costruttore
+Se viene fornito un HypernymIndex, lcs e distanze sono calcolati sull'indice precalcolato
+invece di enumerare i path degli iperonimi
 """
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
 
+import json
+import os
 from nltk.corpus import wordnet as wn
 
+from src.wordnet_files import wordnet_key
+
 
 class WordNetDriver:
 
-    def __init__(self):
-        self.depth_max = self.depth_max()
+    def __init__(self, index=None, depth_max=None, cache=None):
+        self.index = index
+        self.cache = cache
+        self._depth_max = depth_max
+
+    @property
+    def depth_max(self):
+        """
+        :return: la profondità massima dell'albero di WordNet, calcolata al primo accesso
+        """
+
+        if self._depth_max is None:
+            self._depth_max = self.load_depth_max()
+        return self._depth_max
+
+    def load_depth_max(self):
+        """
+        Ricava la profondità massima dall'indice (se presente), dalla cache su disco
+        oppure, in ultima istanza, visitando tutti i synset (il risultato viene salvato in cache)
+        :return: la profondità massima dell'albero di WordNet
+        """
+
+        if self.index is not None:
+            return int(self.index.max_depth.max()) + 1
+
+        if self.cache is None:
+            return self.compute_depth_max()
+
+        key = self.wordnet_key()
+        cached = {}
+        if os.path.exists(self.cache):
+            with open(self.cache, 'r') as file:
+                cached = json.load(file)
+            if key in cached:
+                return cached[key]
+
+        cached[key] = self.compute_depth_max()
+        cache_dir = os.path.dirname(self.cache)
+        if cache_dir != '':
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(self.cache, 'w') as out:
+            json.dump(cached, out)
+        return cached[key]
 
     def depth_path(self, synset, lcs):
         """
@@ -21,6 +69,12 @@ class WordNetDriver:
         :return: il path minimo che contiene lcs
         """
 
+        if self.index is not None:
+            # path minimo = path minimo di lcs + archi minimi da synset a lcs
+            lcs_id = self.index.synset_id(lcs)
+            hops = self.index.hops_to(self.index.synset_id(synset), lcs_id)
+            return int(self.index.min_depth[lcs_id]) + 1 + hops
+
         paths = synset.hypernym_paths()
         paths = list(filter(lambda x: lcs in x, paths))  # path che contengono lcs
         return min(len(path) for path in paths)
@@ -35,6 +89,10 @@ class WordNetDriver:
         if synset1 == synset2:
             return synset1
 
+        if self.index is not None:
+            lcs, _ = self.index.lcs_distance(self.index.synset_id(synset1), self.index.synset_id(synset2))
+            return self.index.synset(lcs) if lcs >= 0 else None
+
         commons = []
         for h in synset1.hypernym_paths():
             for k in synset2.hypernym_paths():
@@ -62,6 +120,10 @@ class WordNetDriver:
         :return: distanza tra i due sensi
         """
 
+        if self.index is not None:
+            lcs, dist = self.index.lcs_distance(self.index.synset_id(synset1), self.index.synset_id(synset2))
+            return dist if lcs >= 0 else None
+
         lcs = self.lowest_common_subsumer(synset1, synset2)
         lists_synset1 = synset1.hypernym_paths()
         lists_synset2 = synset2.hypernym_paths()
@@ -88,7 +150,15 @@ class WordNetDriver:
         return min(list(map(lambda x: len(x), lists_synset1))) + min(list(map(lambda x: len(x), lists_synset2))) - 2
 
     @staticmethod
-    def depth_max():
+    def wordnet_key():
+        """
+        :return: chiave che identifica la versione di WordNet installata (versione e dimensione dei file dati)
+        """
+
+        return wordnet_key()
+
+    @staticmethod
+    def compute_depth_max():
         """
         :return: la profondità massima dell'albero di WordNet (20)
         """
@@ -0,0 +1,249 @@
+"""
+Evaluation module
+corpus-level evaluation of the lesk algorithm on SemCor:
+files are spread over a pool of processes, each one keeping a warm signature cache
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from functools import partial
+from multiprocessing import Pool
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from src.Esercitazione2.lesk import lesk_batch, wordnet_pos
+from src.Esercitazione2.signatures import SignatureIndex
+from src.Esercitazione2.semcor import iter_xml, read_ahead
+from src.wordnet_files import reset_wordnet_files
+
+_signatures = None  # SignatureIndex del processo worker
+
+
+def init_worker(signatures_path):
+    """
+    Inizializza il processo worker caricando l'indice delle signature
+    :param signatures_path: directory del SignatureIndex (None per non usarlo)
+    """
+
+    global _signatures
+    reset_wordnet_files()  # i file di WordNet ereditati dal padre (fork) condividono l'offset di lettura
+    _signatures = SignatureIndex.load(signatures_path) if signatures_path else None
+
+
+def disambiguate(sentences, signatures=None):
+    """
+    Disambigua le frasi e confronta i sensi con quelli annotati
+    :param sentences: iterabile di (sentence, [(word, gold, pos)])
+    :param signatures: SignatureIndex (None per calcolare le signature)
+    :return: generatore di (sentence, [{'word', 'gold', 'value', 'pos'}])
+    """
+
+    for sentence, words in sentences:
+        # wnsn è il numero del senso nella PoS della parola
+        values = lesk_batch(sentence, [(t[0], wordnet_pos(t[2])) for t in words], signatures)
+        yield sentence, [{'word': t[0], 'gold': t[1], 'value': str(v), 'pos': t[2]} for t, v in zip(words, values)]
+
+
+def evaluate_file(path, pos_tags=('NN',), signatures=None):
+    """
+    :param path: file SemCor
+    :param pos_tags: PoS delle parole da disambiguare
+    :param signatures: SignatureIndex (default quello del processo worker)
+    :return: (path, Accuracy del file, risultati [(sentence, [dict])] delle frasi con almeno una parola)
+    """
+
+    if signatures is None:
+        signatures = _signatures
+
+    accuracy = Accuracy()
+    results = []
+    for sentence, dict_list in disambiguate(read_ahead(iter_xml(path, pos_tags)), signatures):
+        accuracy.add(dict_list)
+        if len(dict_list) > 0:
+            results.append((sentence, dict_list))
+
+    return path, accuracy, results
+
+
+def list_files(path):
+    """
+    :param path: file SemCor oppure directory
+    :return: lista dei file SemCor
+    """
+
+    if os.path.isdir(path):
+        return [os.path.join(path, f) for f in sorted(os.listdir(path)) if os.path.isfile(os.path.join(path, f))]
+    return [path]
+
+
+def evaluate_corpus(path, processes=1, signatures_path=None, pos_tags=('NN',), signatures=None):
+    """
+    Valuta tutti i file SemCor di path, distribuendoli su un pool di processi
+    :param path: file SemCor oppure directory
+    :param processes: numero di processi
+    :param signatures_path: directory del SignatureIndex da caricare nei worker
+    :param pos_tags: PoS delle parole da disambiguare
+    :param signatures: SignatureIndex da usare se processes = 1
+    :return: generatore di risultati di evaluate_file, nell'ordine dei file
+    """
+
+    files = list_files(path)
+    if processes <= 1:
+        for file in files:
+            yield evaluate_file(file, pos_tags, signatures)
+        return
+
+    with Pool(processes, initializer=init_worker, initargs=(signatures_path,)) as pool:
+        yield from pool.imap(partial(evaluate_file, pos_tags=pos_tags), files)
+
+
+class Accuracy:
+    """
+    Contatori di parole disambiguate e corrette, complessivi e per PoS
+
+    Attributes:
+        sentences: numero di frasi
+        words: {pos: parole disambiguate}
+        exact: {pos: parole disambiguate correttamente}
+        elapsed: secondi di elaborazione
+    """
+
+    def __init__(self):
+        self.sentences = 0
+        self.words = {}
+        self.exact = {}
+        self.start_time = time.time()
+        self.elapsed = 0
+
+    def add(self, dict_list):
+        """
+        :param dict_list: risultati di una frase [{'word', 'gold', 'value', 'pos'}]
+        """
+
+        self.sentences += 1
+        for d in dict_list:
+            self.words[d['pos']] = self.words.get(d['pos'], 0) + 1
+            if d['gold'] == d['value']:
+                self.exact[d['pos']] = self.exact.get(d['pos'], 0) + 1
+        self.elapsed = time.time() - self.start_time
+
+    def merge(self, other):
+        """
+        Aggiunge i contatori di un'altra Accuracy (e.g di un file)
+        """
+
+        self.sentences += other.sentences
+        for pos, n in other.words.items():
+            self.words[pos] = self.words.get(pos, 0) + n
+        for pos, n in other.exact.items():
+            self.exact[pos] = self.exact.get(pos, 0) + n
+        self.elapsed = time.time() - self.start_time
+
+    def accuracy(self, pos=None):
+        """
+        :param pos: PoS (None per l'accuratezza complessiva)
+        :return: accuratezza (0 se non ci sono parole)
+        """
+
+        if pos is None:
+            words = sum(self.words.values())
+            exact = sum(self.exact.values())
+        else:
+            words = self.words.get(pos, 0)
+            exact = self.exact.get(pos, 0)
+        return exact / words if words > 0 else 0
+
+    def throughput(self):
+        """
+        :return: frasi al secondo
+        """
+
+        return self.sentences / self.elapsed if self.elapsed > 0 else 0
+
+    def report(self):
+        """
+        :return: descrizione testuale delle statistiche
+        """
+
+        lines = ['accuracy: {0:.4f} ({1} words, {2} sentences)'.format(
+            self.accuracy(), sum(self.words.values()), self.sentences)]
+        for pos in sorted(self.words):
+            lines.append('  {0}: {1:.4f} ({2} words)'.format(pos, self.accuracy(pos), self.words[pos]))
+        lines.append('{0:.1f} sentences/sec'.format(self.throughput()))
+        return '\n'.join(lines)
+
+
+class ResultWriter:
+    """
+    Scrive i risultati in streaming: ogni frase viene scritta come elemento s appena disambiguata,
+    le statistiche complessive sono scritte alla fine nell'elemento summary
+    Usato con with, il documento viene chiuso anche se l'elaborazione fallisce (summary con complete="false")
+
+    Attributes:
+        out: file di output (binario)
+        snum: numero di frasi scritte
+        accuracy: Accuracy complessiva (aggiornata dal chiamante), scritta nel summary
+    """
+
+    def __init__(self, path, accuracy=None):
+        self.out = open(path, 'wb')
+        self.out.write(b'<results>')
+        self.snum = 0
+        self.accuracy = accuracy
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+        return False
+
+    def write(self, sentence, dict_list):
+        """
+        :param sentence: frase
+        :param dict_list: risultati della frase [{'word', 'gold', 'value', 'pos'}]
+        """
+
+        self.snum += 1
+        xml_s = ET.Element('s')
+        xml_s.set('snum', str(self.snum))
+        xml_sentence = ET.SubElement(xml_s, 'sentence')
+        xml_sentence.text = sentence
+        for tword in dict_list:
+            xml_word = ET.SubElement(xml_sentence, 'word')
+            xml_word.text = tword['word']
+            xml_word.set('golden', tword['gold'])
+            xml_word.set('sense', tword['value'])
+        self.out.write(ET.tostring(xml_s))
+
+    def close(self, accuracy=None, complete=True):
+        """
+        Scrive l'elemento summary (se fornita l'Accuracy) e chiude il documento (chiamate successive non hanno effetto)
+        :param accuracy: Accuracy complessiva (default self.accuracy)
+        :param complete: False se l'elaborazione è stata interrotta
+        """
+
+        if self.out.closed:
+            return
+
+        if accuracy is None:
+            accuracy = self.accuracy
+
+        if accuracy is not None:
+            summary = ET.Element('summary')
+            summary.set('accuracy', '{0:.4f}'.format(accuracy.accuracy()))
+            summary.set('words', str(sum(accuracy.words.values())))
+            summary.set('sentences', str(accuracy.sentences))
+            summary.set('throughput', '{0:.1f}'.format(accuracy.throughput()))
+            if not complete:
+                summary.set('complete', 'false')
+            for pos in sorted(accuracy.words):
+                xml_pos = ET.SubElement(summary, 'pos')
+                xml_pos.set('tag', pos)
+                xml_pos.set('accuracy', '{0:.4f}'.format(accuracy.accuracy(pos)))
+                xml_pos.set('words', str(accuracy.words[pos]))
+            self.out.write(ET.tostring(summary))
+
+        self.out.write(b'</results>')
+        self.out.close()
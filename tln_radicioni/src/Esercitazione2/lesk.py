@@ -5,9 +5,9 @@ provides an implementation of the lesk algorithm and a set of utilies methods
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
 
-import nltk
 from nltk.corpus import wordnet as wn
-from nltk.corpus import stopwords
+
+from src.normalizer import get_normalizer
 
 
 def find_synonims(sense):
@@ -32,12 +32,7 @@ def bag_of_word(sent):
     :return: bag of words
     """
 
-    stop_words = set(stopwords.words('english'))
-    punct = {',', ';', '(', ')', '{', '}', ':', '?', '!'}
-    wnl = nltk.WordNetLemmatizer()
-    tokens = nltk.word_tokenize(sent)
-    tokens = list(filter(lambda x: x not in stop_words and x not in punct, tokens))
-    return set(wnl.lemmatize(t) for t in tokens)
+    return get_normalizer().bag_of_word(sent)
 
 
 def compute_overlap(signature, context):
@@ -52,35 +47,125 @@ def compute_overlap(signature, context):
     return len(signature & context)
 
 
-def lesk(word, sentence):
+_synsets = {}  # {(word, pos): senses}
+
+_wordnet_pos = [('NN', 'n'), ('VB', 'v'), ('JJ', 'a'), ('RB', 'r')]  # (SemCor tag prefix, WordNet PoS)
+
+
+def wordnet_pos(tag):
+    """
+    SemCor numbers the senses (wnsn) within the part of speech of the word
+    :param tag: SemCor PoS tag (e.g NN, NNS, VBD)
+    :return: corresponding WordNet PoS (n, v, a, r), None if there is no correspondence
+    """
+
+    for prefix, pos in _wordnet_pos:
+        if tag.startswith(prefix):
+            return pos
+    return None
+
+
+def get_synsets(word, pos=None):
+    """
+    :param word: word
+    :param pos: WordNet PoS (None for all the senses)
+    :return: list of senses of the word (memoized)
+    """
+
+    senses = _synsets.get((word, pos))
+    if senses is None:
+        senses = wn.synsets(word, pos)
+        _synsets[(word, pos)] = senses
+    return senses
+
+
+def get_signature(sense, signatures=None):
+    """
+    :param sense: synset
+    :param signatures: SignatureIndex with the precomputed signatures (None to compute it)
+    :return: signature of the sense (bag of words of definition + examples)
+    """
+
+    if signatures is not None:
+        return signatures.signature(sense)
+
+    signature = bag_of_word(sense.definition())
+    examples = sense.examples()
+    for ex in examples:
+        signature = signature.union(bag_of_word(ex))  # bag of words definition + examples
+    return signature
+
+
+def get_context(sentence, signatures=None):
+    """
+    :param sentence: sentence
+    :param signatures: SignatureIndex (the context is encoded with its token ids)
+    :return: context bag of words of the sentence
+    """
+
+    context = bag_of_word(sentence)
+    if signatures is not None:
+        context = signatures.encode(context)
+    return context
+
+
+def best_sense_index(senses, context, signatures=None, overlaps=None):
+    """
+    :param senses: candidate senses
+    :param context: context bag of words (see get_context)
+    :param signatures: SignatureIndex (None to compute the signatures)
+    :param overlaps: memoized overlaps {sense: overlap} shared between targets of the same context
+    :return: position of the sense with the maximum overlap (the first one if there is no overlap)
+    """
+
+    if overlaps is None:
+        overlaps = {}
+
+    best = 0
+    max_overlap = 0
+    for i, sense in enumerate(senses):
+        if sense not in overlaps:
+            overlaps[sense] = compute_overlap(get_signature(sense, signatures), context)
+        if overlaps[sense] > max_overlap:
+            max_overlap = overlaps[sense]
+            best = i
+
+    return best
+
+
+def lesk(word, sentence, signatures=None):
     """
     Implementazione dell'algoritmo lesk.
     Data una parola ed una frase in cui compare, ritorna il miglior senso della parola
 
     :param word: parola da disambiguare
     :param sentence: frase in cui compare
+    :param signatures: SignatureIndex con le signature precalcolate (None per calcolarle)
     :return: miglior senso di quella parola
     """
 
-    senses = wn.synsets(word)
-    best_sense = senses[0]
-    max_overlap = 0
-    context = bag_of_word(sentence)
+    senses = get_synsets(word)
+    context = get_context(sentence, signatures)
+    return senses[best_sense_index(senses, context, signatures)]
+
 
-    for sense in senses:
-        signature = bag_of_word(sense.definition())
-        examples = sense.examples()
-        for ex in examples:
-            signature = signature.union(bag_of_word(ex))  # bag of words definition + examples
-        overlap = compute_overlap(signature, context)
-        if overlap > max_overlap:
-            max_overlap = overlap
-            best_sense = sense
+def lesk_batch(sentence, targets, signatures=None):
+    """
+    Disambiguates all the target words of a sentence:
+    the context is computed once and each sense is scored only once
+
+    :param sentence: sentence
+    :param targets: list of (word, WordNet PoS) to disambiguate (PoS None for all the senses)
+    :param signatures: SignatureIndex with the precomputed signatures (None to compute them)
+    :return: list of sense indices within the PoS (starting from 1, as in get_sense_index), one for each target
+    """
 
-    return best_sense
+    context = get_context(sentence, signatures)
+    overlaps = {}
+    return [best_sense_index(get_synsets(word, pos), context, signatures, overlaps) + 1 for word, pos in targets]
 
 
-def get_sense_index(word, sense):
+def get_sense_index(word, sense, pos=None):
     """
     Given a ambiguous word and a sense of this word,
     it returns the corresponding index of the sense in the synsets list associated with the word
@@ -88,8 +173,9 @@ def get_sense_index(word, sense):
 
     :param word: ambiguous word (with more that 1 sense)
     :param sense: sense of the word
+    :param pos: WordNet PoS (None for all the senses)
     :return: index of the sense in the synsets list of the word
     """
 
-    senses = wn.synsets(word)
+    senses = get_synsets(word, pos)
     return senses.index(sense) + 1
@@ -0,0 +1,119 @@
+"""
+SemCor module
+streaming reader of the SemCor corpus (Brown Corpus annotated with WordNet senses)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import os
+import queue
+import re
+import threading
+from lxml import etree as Exml
+
+from src.Esercitazione2.lesk import get_synsets, wordnet_pos
+
+
+def parse_sentence(sentence, pos_tags=('NN',)):
+    """
+    Ricava la frase e le parole da disambiguare di un tag s
+    (parole con PoS in pos_tags, num sensi >=2 nella loro PoS e senso annotato)
+
+    :param sentence: elemento s (lxml)
+    :param pos_tags: PoS delle parole da disambiguare
+    :return: (sentence, [(word, gold, pos)])
+    """
+
+    words = sentence.findall('wf')
+    sent = ""
+    tuple_list = []
+    for word in words:
+        w = word.text
+        pos = word.attrib['pos']
+        sent = sent + w + ' '
+        if pos in pos_tags and '_' not in w and len(get_synsets(w, wordnet_pos(pos))) > 1 and 'wnsn' in word.attrib:
+            sense = word.attrib['wnsn']
+            t = (w, sense, pos)
+            tuple_list.append(t)
+    return sent, tuple_list
+
+
+def iter_xml(path, pos_tags=('NN',)):
+    """
+    Legge in streaming SemCor Corpus annotato manualmente sui Synset di WordNet
+
+    1) leggo il file xml una riga alla volta, correggendo gli attributi non quotati
+    2) parsing incrementale, ad ogni tag s (figlio di p) chiuso ricavo frase e parole da disambiguare
+    3) libero la memoria occupata dai tag già processati
+
+    :param path: percorso del file XML (Brown Corpus) oppure directory contenente i file
+    :param pos_tags: PoS delle parole da disambiguare
+    :return: generatore di (sentence, [(word, gold, pos)])
+    """
+
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if os.path.isfile(os.path.join(path, name)):
+                yield from iter_xml(os.path.join(path, name), pos_tags)
+        return
+
+    # correzioni xml non ben formattato
+    replacer = re.compile("=([\w|:|\-|$|(|)|']*)")
+    parser = Exml.XMLPullParser(events=('end',), tag='s')
+    try:
+        with open(path, 'r') as fileXML:
+            for line in fileXML:
+                parser.feed(replacer.sub(r'="\1"', line.replace('\n', '')))
+                for _, sentence in parser.read_events():
+                    if sentence.getparent() is not None and sentence.getparent().tag == 'p':
+                        yield parse_sentence(sentence, pos_tags)
+                    sentence.clear()
+                    while sentence.getprevious() is not None:
+                        del sentence.getparent()[0]
+        parser.close()
+    except Exml.XMLSyntaxError as e:
+        raise NameError('xml: ' + str(e))
+
+
+def parse_xml(path, pos_tags=('NN',)):
+    """
+    Parsifica SemCor Corpus annotato manualmente sui Synset di WordNet
+
+    :param path: percorso del file XML (Brown Corpus) oppure directory contenente i file
+    :param pos_tags: PoS delle parole da disambiguare
+    :return: [(sentence, [(word, gold, pos)])]
+    """
+
+    return list(iter_xml(path, pos_tags))
+
+
+def read_ahead(iterable, size=64):
+    """
+    Legge l'iterabile in un thread separato, in modo da sovrapporre I/O e disambiguazione
+
+    :param iterable: iterabile da leggere (e.g iter_xml)
+    :param size: numero massimo di elementi letti in anticipo
+    :return: generatore degli elementi dell'iterabile
+    """
+
+    buffer = queue.Queue(size)
+    end = object()
+    errors = []
+
+    def producer():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            buffer.put(end)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    item = buffer.get()
+    while item is not end:
+        yield item
+        item = buffer.get()
+    if len(errors) > 0:
+        raise errors[0]
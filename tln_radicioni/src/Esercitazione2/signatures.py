@@ -0,0 +1,137 @@
+"""
+Signature index
+precomputes the lesk signature (bag of words of definition + examples) of every WordNet synset,
+stored as sorted token-id arrays (CSR layout) and memory-mapped on later runs
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import os
+import numpy as np
+from nltk.corpus import wordnet as wn
+
+from src.normalizer import get_normalizer
+from src.string_table import read_manifest, write_manifest, remove_manifest
+from src.wordnet_files import wordnet_key
+
+
+class SignatureIndex:
+    """
+    Signatures of all WordNet synsets
+    (the token ids of synset i are tokens[indptr[i]:indptr[i + 1]])
+
+    Attributes:
+        vocabulary: list of tokens (the id of a token is its position)
+        token_ids: dictionary {token: id}
+        names: list of synset names
+        synset_ids: dictionary {synset name: row}
+        indptr: CSR row offsets
+        tokens: token ids of every signature (sorted)
+        cache: memoized signatures {row: frozenset of token ids}
+    """
+
+    def __init__(self, vocabulary, names, indptr, tokens):
+        self.vocabulary = vocabulary
+        self.token_ids = {t: i for i, t in enumerate(vocabulary)}
+        self.names = names
+        self.synset_ids = {name: i for i, name in enumerate(names)}
+        self.indptr = indptr
+        self.tokens = tokens
+        self.cache = {}
+
+    @classmethod
+    def build(cls, batch=1024):
+        """
+        Computes the signature of every synset (definition + examples)
+        :param batch: synsets normalized together (each distinct token is lemmatized once per batch)
+        :return: SignatureIndex
+        """
+
+        normalizer = get_normalizer()  # same normalization as lesk.bag_of_word
+        token_ids = {}
+        names = []
+        indptr = [0]
+        tokens = []
+        senses = list(wn.all_synsets())
+        for start in range(0, len(senses), batch):
+            # definitions and examples of a chunk of synsets are normalized together
+            texts = [[sense.definition()] + sense.examples() for sense in senses[start:start + batch]]
+            bags = iter(normalizer.batch(text for sense_texts in texts for text in sense_texts))
+            for sense, sense_texts in zip(senses[start:start + batch], texts):
+                signature = set().union(*(next(bags) for _ in sense_texts))
+                ids = sorted(token_ids.setdefault(t, len(token_ids)) for t in signature)
+
+                names.append(sense.name())
+                tokens.extend(ids)
+                indptr.append(len(tokens))
+
+        vocabulary = sorted(token_ids, key=token_ids.get)
+        return cls(vocabulary, names, np.array(indptr, dtype=np.int64), np.array(tokens, dtype=np.int32))
+
+    def save(self, path):
+        """
+        :param path: destination directory
+        """
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'tokens.npy'), self.tokens)
+        with open(os.path.join(path, 'vocabulary.txt'), 'w', encoding='utf-8') as out:
+            out.write('\n'.join(self.vocabulary))
+        with open(os.path.join(path, 'names.txt'), 'w', encoding='utf-8') as out:
+            out.write('\n'.join(self.names))
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: index directory (arrays are memory-mapped)
+        :return: SignatureIndex
+        """
+
+        with open(os.path.join(path, 'vocabulary.txt'), 'r', encoding='utf-8') as file:
+            vocabulary = file.read().split('\n')
+        with open(os.path.join(path, 'names.txt'), 'r', encoding='utf-8') as file:
+            names = file.read().split('\n')
+        indptr = np.load(os.path.join(path, 'indptr.npy'), mmap_mode='r')
+        tokens = np.load(os.path.join(path, 'tokens.npy'), mmap_mode='r')
+        return cls(vocabulary, names, indptr, tokens)
+
+    @classmethod
+    def load_or_build(cls, path):
+        """
+        The manifest of the directory records the WordNet version (wordnet_key): the index is rebuilt if it differs
+        :param path: index directory
+        :return: the index saved in path, built and saved if it does not exist (or it is from another WordNet)
+        """
+
+        manifest = {'wordnet': wordnet_key()}
+        if read_manifest(path) == manifest:
+            return cls.load(path)
+
+        os.makedirs(path, exist_ok=True)
+        remove_manifest(path)
+        index = cls.build()
+        index.save(path)
+        write_manifest(path, manifest)
+        return index
+
+    def signature(self, sense):
+        """
+        :param sense: synset
+        :return: signature of the synset (frozenset of token ids)
+        """
+
+        row = self.synset_ids[sense.name()]
+        if row not in self.cache:
+            self.cache[row] = frozenset(self.tokens[self.indptr[row]:self.indptr[row + 1]].tolist())
+        return self.cache[row]
+
+    def encode(self, bag):
+        """
+        Tokens that do not appear in any signature are dropped (they cannot overlap)
+
+        :param bag: bag of words (e.g. context)
+        :return: set of token ids
+        """
+
+        return {self.token_ids[t] for t in bag if t in self.token_ids}
@@ -0,0 +1,306 @@
+"""
+Il seguente modulo contiene la rappresentazione compatta dei vettori Nasari (rappresentazione Lexical)
+e l'implementazione della Weighted Overlap come merge-join sugli id dei termini
+Il file testuale viene convertito una sola volta in formato binario (memory-mapped nelle esecuzioni successive)
+
+Modulo condiviso: tln_radicioni/src/Esercitazione3/Nasari.py e tln_dicaro/src/Segmentation/nasari.py
+devono restare identici (verifica con python check_shared.py dalla root del repository)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from collections.abc import Mapping
+import os
+import numpy as np
+
+from src.string_table import StringTable, sorted_strings
+from src.string_table import source_manifest, read_manifest, write_manifest, remove_manifest
+
+
+class NasariVector:
+    """
+    Vettore Nasari con rank precalcolati
+
+    Attributes:
+        ids: id dei termini del vettore, ordinati (per il merge-join)
+        ranks: rank (posizione nel vettore originale, a partire da 1) del termine corrispondente in ids
+    """
+
+    __slots__ = ['ids', 'ranks']
+
+    def __init__(self, term_ids):
+        """
+        :param term_ids: id dei termini, nell'ordine del vettore (score decrescente)
+        """
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')
+        self.ids = term_ids[order]
+        self.ranks = (order + 1).astype(np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+_harmonic = np.zeros(1)  # _harmonic[n] = sum 1/(2*i) per i = 1..n
+
+
+def harmonic(n):
+    """
+    :param n: numero di termini in comune
+    :return: normalizzatore della Weighted Overlap, sum 1/(2*i) per i = 1..n (tabella calcolata una volta)
+    """
+
+    global _harmonic
+
+    if n >= len(_harmonic):
+        size = max(n + 1, 2 * len(_harmonic))
+        _harmonic = np.concatenate(([0], np.cumsum(1 / (2 * np.arange(1, size)))))
+    return _harmonic[n]
+
+
+def harmonic_array(n):
+    """
+    :param n: array del numero di termini in comune
+    :return: array dei normalizzatori della Weighted Overlap (vedi harmonic)
+    """
+
+    if n.size > 0:
+        harmonic(int(n.max()))
+    return _harmonic[n]
+
+
+def weighted_overlap(v1, v2):
+    """
+    Implementazione Weight Overlap (Pilehvar et al.)
+    :param v1: vettore Nasari (topic)
+    :param v2: vettore Nasari (paragrafo)
+    :return: square-rooted Weighted Overlap, 0 se non c'è sovrapposizione
+    """
+
+    _, idx1, idx2 = np.intersect1d(v1.ids, v2.ids, assume_unique=True, return_indices=True)
+
+    if len(idx1) > 0:
+        den = np.sum(1 / (v1.ranks[idx1] + v2.ranks[idx2]))  # sum 1/(rank() + rank())
+        num = harmonic(len(idx1))  # sum 1/(2*i)
+
+        return float(den / num)
+
+    return 0
+
+
+def flatten(vectors):
+    """
+    :param vectors: lista di NasariVector
+    :return: (id dei termini, rank, indice del vettore) di tutti i termini dei vettori
+    """
+
+    if len(vectors) == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+
+    ids = np.concatenate([v.ids for v in vectors])
+    ranks = np.concatenate([v.ranks for v in vectors])
+    rows = np.repeat(np.arange(len(vectors)), [len(v) for v in vectors])
+    return ids, ranks, rows
+
+
+def overlap_matrix(vectors1, vectors2):
+    """
+    Weighted Overlap di tutte le coppie di vettori, calcolata con un unico join sugli id dei termini
+    (la complessità dipende dal numero di coppie di termini in comune, non dal prodotto dei vettori)
+    :param vectors1: lista di NasariVector (e.g topic)
+    :param vectors2: lista di NasariVector (e.g contesto)
+    :return: matrice len(vectors1) x len(vectors2), in [i, j] weighted_overlap(vectors1[i], vectors2[j])
+    """
+
+    n1, n2 = len(vectors1), len(vectors2)
+    ids1, ranks1, rows1 = flatten(vectors1)
+    ids2, ranks2, rows2 = flatten(vectors2)
+
+    # per ogni termine di vectors1, l'intervallo dei termini uguali in vectors2 (ordinati per id)
+    order = np.argsort(ids2, kind='stable')
+    ids2, ranks2, rows2 = ids2[order], ranks2[order], rows2[order]
+    start = np.searchsorted(ids2, ids1, side='left')
+    counts = np.searchsorted(ids2, ids1, side='right') - start
+
+    # espande le coppie di termini in comune: (idx1[k], idx2[k])
+    idx1 = np.repeat(np.arange(len(ids1)), counts)
+    offsets = np.arange(len(idx1)) - np.repeat(np.cumsum(counts) - counts, counts)
+    idx2 = np.repeat(start, counts) + offsets
+
+    cells = rows1[idx1] * n2 + rows2[idx2]
+    den = np.bincount(cells, weights=1 / (ranks1[idx1] + ranks2[idx2]), minlength=n1 * n2)  # sum 1/(rank() + rank())
+    common = np.bincount(cells, minlength=n1 * n2)
+
+    wo = np.zeros(n1 * n2)
+    mask = common > 0
+    wo[mask] = den[mask] / harmonic_array(common[mask])  # sum 1/(2*i)
+    return wo.reshape(n1, n2)
+
+
+class NasariStore(Mapping):
+    """
+    Dizionario {word: NasariVector} in formato CSR
+    (i termini del vettore della riga i sono term_ids[indptr[i]:indptr[i + 1]], in ordine di score)
+    Parole e termini sono StringTable: nel formato binario sono memory-mapped e decodificati solo quando servono
+
+    Attributes:
+        words: parole distinte, ordinate (ricerca binaria)
+        word_rows: riga del vettore di ogni parola di words
+        terms: termini (l'id di un termine è la sua posizione)
+        indptr: offset delle righe CSR
+        term_ids: id dei termini di ogni vettore
+        scores: score (float32) dei termini di ogni vettore
+        rows: ricerche già eseguite {word: riga, -1 se assente}
+        vectors: vettori già costruiti {riga: NasariVector}
+    """
+
+    files = ['word_rows', 'indptr', 'term_ids', 'scores']
+
+    def __init__(self, words, word_rows, terms, indptr, term_ids, scores):
+        self.words = words
+        self.word_rows = word_rows
+        self.terms = terms
+        self.indptr = indptr
+        self.term_ids = term_ids
+        self.scores = scores
+        self.rows = {}
+        self.vectors = {}
+
+    @classmethod
+    def from_text(cls, path, sep=';', limit=None):
+        """
+        Parsifica il file di input Nasari (rappresentazione Lexical)
+        :param path: percorso del file Nasari
+        :param sep: separatore dei campi della riga
+        :param limit: indice del campo oltre cui i termini vengono ignorati (None per tutti)
+        :return: NasariStore
+        """
+
+        term_ids = {}
+        words = []
+        indptr = [0]
+        ids = []
+        scores = []
+        with open(path, 'r', encoding="utf8") as file:
+            for line in file:
+                splits = line.split(sep)
+                vector_dict = {}
+
+                for term in splits[2:limit]:
+                    k = term.split("_")
+                    if len(k) > 1:
+                        vector_dict[k[0]] = k[1]
+
+                words.append(splits[1].lower())
+                for term, score in vector_dict.items():
+                    ids.append(term_ids.setdefault(term, len(term_ids)))
+                    scores.append(to_float(score))
+                indptr.append(len(ids))
+
+        # a parità di parola vale l'ultima riga (come nel dizionario originale)
+        sorted_words, word_rows = sorted_strings(words)
+        terms = StringTable.from_strings(sorted(term_ids, key=term_ids.get))
+        return cls(sorted_words, word_rows, terms, np.array(indptr, dtype=np.int64), np.array(ids, dtype=np.int32),
+                   np.array(scores, dtype=np.float32))
+
+    def save(self, path):
+        """
+        :param path: directory di destinazione
+        """
+
+        os.makedirs(path, exist_ok=True)
+        for f in self.files:
+            np.save(os.path.join(path, f + '.npy'), getattr(self, f))
+        self.words.save(path, 'words')
+        self.terms.save(path, 'terms')
+
+    @classmethod
+    def load(cls, path):
+        """
+        Nessun file viene parsificato: tutti gli array sono memory-mapped (pagine condivise tra processi)
+        :param path: directory del formato binario
+        :return: NasariStore
+        """
+
+        word_rows, indptr, term_ids, scores = [np.load(os.path.join(path, f + '.npy'), mmap_mode='r')
+                                               for f in cls.files]
+        return cls(StringTable.load(path, 'words'), word_rows, StringTable.load(path, 'terms'), indptr, term_ids,
+                   scores)
+
+    @classmethod
+    def load_or_build(cls, path, source, sep=';', limit=None):
+        """
+        Il manifest della directory registra il file sorgente (percorso, dimensione, data di modifica), sep e limit:
+        se non corrisponde la conversione viene ripetuta
+        :param path: directory del formato binario
+        :param source: file Nasari testuale
+        :return: lo store salvato in path, se non esiste (o è stato convertito da un altro file) viene convertito
+        """
+
+        manifest = source_manifest(source, sep=sep, limit=limit)
+        if read_manifest(path) == manifest:
+            return cls.load(path)
+
+        os.makedirs(path, exist_ok=True)
+        remove_manifest(path)
+        store = cls.from_text(source, sep, limit)
+        store.save(path)
+        write_manifest(path, manifest)
+        return store
+
+    def row(self, word):
+        """
+        :param word: parola
+        :return: riga del vettore della parola, -1 se non presente (ricerca binaria, memorizzata)
+        """
+
+        row = self.rows.get(word)
+        if row is None:
+            pos = self.words.find(word)
+            row = int(self.word_rows[pos]) if pos >= 0 else -1
+            self.rows[word] = row
+        return row
+
+    def vector(self, word):
+        """
+        :param word: parola
+        :return: vettore Nasari come dizionario {term: score}, in ordine di score (i termini sono decodificati qui)
+        """
+
+        row = self.row(word)
+        if row < 0:
+            raise KeyError(word)
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return {self.terms[t]: float(s) for t, s in zip(self.term_ids[start:end], self.scores[start:end])}
+
+    def __getitem__(self, word):
+        row = self.row(word)
+        if row < 0:
+            raise KeyError(word)
+        vector = self.vectors.get(row)
+        if vector is None:
+            vector = NasariVector(self.term_ids[self.indptr[row]:self.indptr[row + 1]])
+            self.vectors[row] = vector
+        return vector
+
+    def __contains__(self, word):
+        return self.row(word) >= 0
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+
+def to_float(score):
+    """
+    :param score: score in formato stringa
+    :return: score numerico (nan se non valido)
+    """
+
+    try:
+        return float(score)
+    except ValueError:
+        return float('nan')
@@ -0,0 +1,241 @@
+"""
+Il seguente modulo contiene il riassunto degli articoli:
+i vettori di contesto dei paragrafi sono calcolati una sola volta per articolo e condivisi tra i topic extractor,
+gli articoli sono distribuiti su un pool di processi che caricano lo stesso NasariStore (memory-mapped)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from functools import partial
+import json
+from multiprocessing import Pool
+import numpy as np
+
+from src.Esercitazione3 import Topics
+from src.Esercitazione3.Nasari import NasariStore, overlap_matrix
+
+_nasari = None  # NasariStore del processo worker
+
+
+def load_nasari(nasari_path, store_path=None):
+    """
+    :param nasari_path: file Nasari testuale
+    :param store_path: directory del formato binario (None per parsificare il file testuale)
+    :return: NasariStore
+    """
+
+    if store_path:
+        return NasariStore.load_or_build(store_path, nasari_path)
+    return NasariStore.from_text(nasari_path)
+
+
+def init_worker(nasari_path, store_path):
+    """
+    Inizializza il processo worker caricando il NasariStore
+    """
+
+    global _nasari
+    _nasari = load_nasari(nasari_path, store_path)
+
+
+def parse_article(text):
+    """
+    Parsifica articolo (testo nel formato dei file txt)
+    :param text: testo dell'articolo
+    :return: dizionario {genre:genere del testo, body: lista di paragrafi (il primo è il titolo)}
+    """
+
+    body = []
+    article = {'genre': 'unknown', 'body': body}
+    lines = text.split('\n')
+
+    for line in lines:
+        if line != '' and line[0] == '@':
+            article['genre'] = line.split(':')[1]
+        elif line.strip() != '' and '#' not in line:
+            body.append(line.rstrip())
+
+    return article
+
+
+def read_article(file):
+    """
+    Parsifica articolo (file di testo txt)
+    :param file: file in input (articolo)
+    :return: dizionario {genre:genere del testo, body: lista di paragrafi (il primo è il titolo)}
+    """
+
+    return parse_article(file.read_text(encoding='utf-8'))
+
+
+def paragraph_contexts(article, nasari_dict):
+    """
+    :param article: rappresentazione articolo
+    :param nasari_dict: dizionario Nasari
+    :return: lista di (indice, paragrafo, vettori di contesto) per ogni paragrafo (titolo escluso)
+    """
+
+    paragraphs = article['body'][1:]
+    return list(zip(range(len(paragraphs)), paragraphs, Topics.create_contexts(paragraphs, nasari_dict)))
+
+
+def summarization(article, nasari_dict, topic_extractor, perc, contexts=None):
+    """
+    Applica riduzione articolo secondo la funzione di estrazione del topic
+    :param article: rappresentazione articolo
+    :param nasari_dict: dizionario Nasari
+    :param topic_extractor: handle funzione estrazione del topic (e.g opp)
+    :param perc: percentuale di riduzione
+    :param contexts: vettori di contesto dei paragrafi (paragraph_contexts), None per calcolarli
+    :return: articolo ridotto
+    """
+
+    if contexts is None:
+        contexts = paragraph_contexts(article, nasari_dict)
+
+    topics = topic_extractor(article, nasari_dict)
+
+    # Weighted Overlap di ogni vettore di contesto (di tutti i paragrafi) con ogni vettore del topic
+    vectors = [w for _, _, context in contexts for w in context]
+    if len(topics) > 0:
+        topic_wo = overlap_matrix(topics, vectors).mean(axis=0)  # media rispetto ai vettori del topic
+    else:
+        topic_wo = np.zeros(len(vectors))
+
+    paragraphs = []
+    j = 0
+    for i, par, context in contexts:
+        if len(context) > 0:
+            paragraph_wo = topic_wo[j:j + len(context)].mean()  # media all'interno del paragrafo
+            paragraphs.append((i, float(paragraph_wo), par))
+        j += len(context)
+
+    limit = int(round((perc / 100) * len(paragraphs), 0))
+
+    # ordina per punteggio e prende i primi 'limit'
+    new_article = sorted(paragraphs, key=lambda x: x[1], reverse=True)[:limit]
+    # ripristina ordine originale
+    new_article = sorted(new_article, key=lambda x: x[0], reverse=True)
+    # elimina stutture di supporto (ad ogni paragrafo abbiamo associato un punteggio)
+    new_article = list(map(lambda x: x[2], new_article))
+
+    new_article = [article['body'][0]] + new_article
+    return new_article
+
+
+def summarize_article(article, nasari_dict, perc, extractors=None):
+    """
+    Riassume l'articolo con tutti i topic extractor, i contesti dei paragrafi sono calcolati una volta
+    :param article: rappresentazione articolo
+    :param nasari_dict: dizionario Nasari
+    :param perc: percentuale di riduzione
+    :param extractors: lista di (funzione, nome) dei topic extractor registrati (default Topics.get_all())
+    :return: lista di (nome extractor, articolo ridotto)
+    """
+
+    if extractors is None:
+        extractors = Topics.get_all()
+
+    # le parti richieste dagli extractor (e.g le frasi) sono condivise tramite una vista locale dell'articolo
+    view = Topics.prepare(article, frozenset().union(*(Topics.get_needs(name) for _, name in extractors)))
+    contexts = paragraph_contexts(article, nasari_dict)
+    return [(name, summarization(view, nasari_dict, f, perc, contexts)) for f, name in extractors]
+
+
+def summarize(stream, nasari_dict, perc, extractors=None):
+    """
+    Riassume gli articoli man mano che vengono letti (il dizionario Nasari resta caricato tra un articolo e l'altro)
+    :param stream: iterabile di articoli, testo nel formato dei file txt oppure dizionario {genre, body}
+    :param nasari_dict: dizionario Nasari
+    :param perc: percentuale di riduzione
+    :param extractors: lista di (funzione, nome) dei topic extractor (default Topics.get_all())
+    :return: generatore di (articolo, lista di (nome extractor, articolo ridotto))
+    """
+
+    for article in stream:
+        if isinstance(article, str):
+            article = parse_article(article)
+        yield article, summarize_article(article, nasari_dict, perc, extractors)
+
+
+def parse_record(record):
+    """
+    :param record: articolo in formato JSON, {"text": testo} oppure {"genre": genere, "body": paragrafi}
+    :return: rappresentazione articolo
+    """
+
+    if 'text' in record:
+        article = parse_article(record['text'])
+    else:
+        article = {'genre': record.get('genre', 'unknown'), 'body': list(record['body'])}
+
+    if len(article['body']) == 0:
+        raise ValueError('empty article')
+    return article
+
+
+def summarize_jsonl(lines, nasari_dict, perc, extractors=None):
+    """
+    Riassume articoli in formato JSON lines (e.g da stdin), una riga per articolo (le righe vuote sono ignorate)
+    Un record non valido non interrompe lo stream: produce una riga {"id", "error"}
+    :param lines: iterabile di righe JSON (vedi parse_record), il campo opzionale id viene riportato in output
+    :param nasari_dict: dizionario Nasari
+    :param perc: percentuale di riduzione
+    :param extractors: lista di (funzione, nome) dei topic extractor (default Topics.get_all())
+    :return: generatore di righe JSON {"id", "genre", "title", "summaries": {nome extractor: paragrafi}}
+    """
+
+    for line in lines:
+        if line.strip() == '':
+            continue
+
+        record_id = None
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('record is not a JSON object')
+            record_id = record.get('id')
+            article = parse_record(record)
+            summaries = summarize_article(article, nasari_dict, perc, extractors)
+        except Exception as e:
+            yield json.dumps({'id': record_id, 'error': '{0}: {1}'.format(type(e).__name__, e)}, ensure_ascii=False)
+            continue
+
+        yield json.dumps({'id': record_id, 'genre': article['genre'], 'title': article['body'][0],
+                          'summaries': {name: new_article for name, new_article in summaries}}, ensure_ascii=False)
+
+
+def summarize_file(file, perc, nasari_dict=None):
+    """
+    :param file: articolo (Path)
+    :param perc: percentuale di riduzione
+    :param nasari_dict: dizionario Nasari (default quello del processo worker)
+    :return: (articolo, lista di (nome extractor, articolo ridotto))
+    """
+
+    if nasari_dict is None:
+        nasari_dict = _nasari
+
+    article = read_article(file)
+    return article, summarize_article(article, nasari_dict, perc)
+
+
+def summarize_corpus(files, perc, processes=1, nasari_path=None, store_path=None, nasari_dict=None):
+    """
+    Riassume gli articoli, distribuendoli su un pool di processi
+    :param files: lista di articoli (Path)
+    :param perc: percentuale di riduzione
+    :param processes: numero di processi
+    :param nasari_path: file Nasari testuale da caricare nei worker
+    :param store_path: directory del formato binario da caricare nei worker (memory-mapped, condiviso)
+    :param nasari_dict: dizionario Nasari da usare se processes = 1
+    :return: generatore di risultati di summarize_file, nell'ordine dei file
+    """
+
+    if processes <= 1:
+        for file in files:
+            yield summarize_file(file, perc, nasari_dict)
+        return
+
+    with Pool(processes, initializer=init_worker, initargs=(nasari_path, store_path)) as pool:
+        yield from pool.imap(partial(summarize_file, perc=perc), files)
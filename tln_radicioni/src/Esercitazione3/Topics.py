@@ -1,13 +1,72 @@
 """
 Il seguente modulo contiene le implementazioni delle tecniche di estrazione del topic
 e alcuni metodi ausiliari
+Le tecniche sono registrate con il decoratore register, dichiarando le parti dell'articolo che utilizzano
 """
 
 __author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
 
-from nltk.corpus import stopwords
 import nltk
 
+from src.normalizer import get_normalizer
+
+_extractors = {}  # registro dei topic extractor {nome: (funzione, parti dell'articolo utilizzate)}
+
+
+def register(name, needs=('title',)):
+    """
+    Decoratore che registra un topic extractor
+    :param name: nome dell'extractor (usato anche nei nomi dei file di output)
+    :param needs: parti dell'articolo utilizzate (e.g title, sentences, paragraphs)
+    :return: decoratore
+    """
+
+    def decorator(extractor):
+        _extractors[name] = (extractor, frozenset(needs))
+        return extractor
+
+    return decorator
+
+
+def get_needs(name):
+    """
+    :param name: nome dell'extractor
+    :return: parti dell'articolo utilizzate dall'extractor
+    """
+
+    return _extractors[name][1]
+
+
+def prepare(article, needs):
+    """
+    Vista dell'articolo per i topic extractor, con le strutture di supporto richieste da needs
+    (e.g la cache delle frasi): l'articolo originale non viene modificato
+    :param article: articolo
+    :param needs: parti dell'articolo utilizzate dagli extractor (unione di get_needs)
+    :return: copia superficiale dell'articolo
+    """
+
+    view = dict(article)
+    if 'sentences' in needs:
+        view['sentences'] = {}  # frasi per indice di paragrafo, calcolate alla prima richiesta
+    return view
+
+
+def paragraph_sentences(article, p):
+    """
+    Frasi del paragrafo, memorizzate nella cache della vista (vedi prepare) se presente
+    :param article: articolo
+    :param p: indice del paragrafo (titolo escluso)
+    :return: lista di frasi del paragrafo
+    """
+
+    cache = article.get('sentences')
+    if cache is None:
+        return nltk.sent_tokenize(article['body'][p + 1])
+    if p not in cache:
+        cache[p] = nltk.sent_tokenize(article['body'][p + 1])
+    return cache[p]
+
 
 def bag_of_word(text):
     """
@@ -18,18 +77,12 @@ def bag_of_word(text):
     :return: rappresentazione BoW del testo
     """
 
-    text = text.lower()
-    stop_words = set(stopwords.words('english'))
-    punct = {',', ';', '(', ')', '{', '}', ':', '?', '!'}
-    wnl = nltk.WordNetLemmatizer()
-    tokens = nltk.word_tokenize(text)
-    tokens = list(filter(lambda x: x not in stop_words and x not in punct, tokens))
-    return set(wnl.lemmatize(t) for t in tokens)
+    return get_normalizer(lower=True).bag_of_word(text)
 
 
 def create_vectors(topic, nasari):
     """
-    Crea una lista di vettori Lexical Nasari (dizionario {term:score})
+    Crea una lista di vettori Lexical Nasari (NasariVector)
     associati ad ogni termine del topic (e.g titolo)
     :param topic: parole del topic
     :param nasari: dizionario NASARI
@@ -38,7 +91,7 @@ def create_vectors(topic, nasari):
 
     vectors = []
     for word in topic:
-        if word in nasari.keys():
+        if word in nasari:
             vectors.append(nasari[word])
 
     return vectors
@@ -46,7 +99,7 @@ def create_vectors(topic, nasari):
 
 def create_context(text, nasari):
     """
-    Crea una lista di vettori Lexical Nasari (dizionaro {term:score})
+    Crea una lista di vettori Lexical Nasari (NasariVector)
     associati ad ogni termine del testo
     :param text: stringa di testo
     :param nasari: dizionario Nasari
@@ -56,12 +109,24 @@ def create_context(text, nasari):
     tokens = bag_of_word(text)
     vectors = []
     for word in tokens:
-        if word in nasari.keys():
+        if word in nasari:
             vectors.append(nasari[word])
 
     return vectors
 
 
+def create_contexts(texts, nasari):
+    """
+    Come create_context per più testi, normalizzati insieme (ogni token distinto viene lemmatizzato una volta)
+    :param texts: lista di stringhe di testo
+    :param nasari: dizionario Nasari
+    :return: lista di liste di vettori Nasari, una per testo
+    """
+
+    return [create_vectors(tokens, nasari) for tokens in get_normalizer(lower=True).batch(texts)]
+
+
+@register('title', needs=('title',))
 def title_topic(article, nasari):
     """
     Crea una lista di vettori Nasari a partire dal titolo dell'articolo
@@ -76,6 +141,7 @@ def title_topic(article, nasari):
     return vectors
 
 
+@register('opp', needs=('title', 'sentences'))
 def opp_topic(article, nasari):
     """
     Crea una lista di vettori Nasari a partire dall'articolo, secondo la metodologia OPP
@@ -91,11 +157,6 @@ def opp_topic(article, nasari):
     :return: lista vettori Nasari
     """
 
-    sentences = []
-    for p in article['body'][1:]:
-        sents = nltk.sent_tokenize(p)
-        sentences.append(sents)
-
     # newspaper
     news_opp = {'title': True,
                 "opps": [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2), (4, 1), (4, 2), (5, 1), (6, 1)]}
@@ -106,6 +167,9 @@ def opp_topic(article, nasari):
     # "opps" corrisponde a (indice paragrafo, indice frase)
     # "title" = true se è necessario considerare anche il titolo
 
+    if 'sentences' not in article:  # articolo senza vista (prepare): cache delle frasi locale alla chiamata
+        article = prepare(article, ('sentences',))
+
     vectors = []
     if article['genre'] == 'wsj':
         opp = wsj_opp
@@ -119,16 +183,18 @@ def opp_topic(article, nasari):
         for t in opp['opps']:
             p = t[0]  # indice paragrafo
             s = t[1]  # indice sentence
-            if p < len(sentences) and s < len(sentences[p]):
-                sent = sentences[t[0]][t[1]]
-                vectors += create_vectors(sent, nasari)
+            # le frasi vengono calcolate solo per i paragrafi letti
+            if p < len(article['body']) - 1:
+                sentences = paragraph_sentences(article, p)
+                if s < len(sentences):
+                    vectors += create_vectors(sentences[s], nasari)
 
     return vectors
 
 
 def get_all():
     """
-    :return: lista di funzioni, per ogni topic extractor
+    :return: lista di (funzione, nome), per ogni topic extractor registrato
     """
 
-    return [(title_topic, 'title'), (opp_topic, 'opp')]
+    return [(extractor, name) for name, (extractor, _) in _extractors.items()]
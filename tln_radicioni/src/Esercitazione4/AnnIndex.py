@@ -0,0 +1,256 @@
+"""
+Il seguente modulo contiene un indice approssimato (IVF, inverted file) per la ricerca dei sensi più simili
+nello spazio dei vettori Nasari (rappresentazione Embedded):
+i vettori sono raggruppati con k-means sferico, una query visita solo i cluster con centroide più vicino
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import os
+import time
+import zlib
+import numpy as np
+
+from src.Esercitazione4.Embeddings import normalize
+from src.string_table import read_manifest, write_manifest, remove_manifest
+
+
+def assign(matrix, centroids, batch=65536):
+    """
+    :param matrix: vettori normalizzati (una riga per vettore)
+    :param centroids: centroidi normalizzati
+    :param batch: righe elaborate per ogni prodotto tra matrici (limita la memoria)
+    :return: indice del centroide più vicino (cosine similarity) per ogni riga
+    """
+
+    labels = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), batch):
+        labels[start:start + batch] = np.argmax(matrix[start:start + batch] @ centroids.T, axis=1)
+    return labels
+
+
+def fingerprint(matrix, samples=1024):
+    """
+    :param matrix: matrice dei vettori indicizzati
+    :param samples: numero di righe (equidistanti) incluse nel checksum
+    :return: dizionario {rows, dim, checksum} che identifica la matrice senza leggerla per intero
+    """
+
+    n = len(matrix)
+    sample = np.unique(np.linspace(0, n - 1, min(samples, n)).astype(np.int64))
+    checksum = zlib.crc32(np.ascontiguousarray(matrix[sample], dtype=np.float32).tobytes())
+    return {'rows': n, 'dim': int(matrix.shape[1]), 'checksum': checksum}
+
+
+def top_k(scores, k):
+    """
+    :param scores: array di punteggi
+    :param k: numero di elementi
+    :return: indici dei k punteggi maggiori, in ordine decrescente
+    """
+
+    if k < len(scores):
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind='stable')]
+
+
+class AnnIndex:
+    """
+    Inverted file: le righe degli Embeddings del cluster c sono rows[indptr[c]:indptr[c + 1]]
+
+    Attributes:
+        embeddings: Embeddings indicizzati
+        centroids: centroidi normalizzati (float32, uno per cluster)
+        indptr: offset dei cluster
+        rows: righe degli Embeddings ordinate per cluster
+        nprobe: numero di cluster visitati per ogni query (default)
+    """
+
+    def __init__(self, embeddings, centroids, indptr, rows, nprobe=8):
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.indptr = indptr
+        self.rows = rows
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, embeddings, n_lists=None, iterations=10, sample=None, seed=0, nprobe=8):
+        """
+        K-means sferico sui vettori normalizzati (addestrato su un campione, poi applicato a tutti i vettori)
+        :param embeddings: Embeddings
+        :param n_lists: numero di cluster (default radice quadrata del numero di vettori)
+        :param iterations: iterazioni di k-means
+        :param sample: numero di vettori usati per l'addestramento (default 256 per cluster)
+        :param seed: seme del generatore casuale
+        :return: AnnIndex
+        """
+
+        matrix = embeddings.matrix
+        n = len(matrix)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        if sample is None:
+            sample = 256 * n_lists
+
+        rng = np.random.default_rng(seed)
+        train = np.asarray(matrix[np.sort(rng.choice(n, min(sample, n), replace=False))], dtype=np.float32)
+        centroids = train[rng.choice(len(train), n_lists, replace=False)]
+
+        for _ in range(iterations):
+            labels = assign(train, centroids)
+            # somma dei vettori di ogni cluster, una bincount per dimensione
+            sums = np.stack([np.bincount(labels, weights=train[:, d], minlength=n_lists)
+                             for d in range(train.shape[1])], axis=1).astype(np.float32)
+            counts = np.bincount(labels, minlength=n_lists)
+
+            empty = counts == 0  # i cluster vuoti ripartono da un vettore casuale
+            sums[empty] = train[rng.choice(len(train), int(empty.sum()))]
+            centroids = normalize(sums)
+
+        labels = assign(matrix, centroids)
+        rows = np.argsort(labels, kind='stable')
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=n_lists))))
+        return cls(embeddings, centroids, indptr.astype(np.int64), rows.astype(np.int64), nprobe)
+
+    def save(self, path):
+        """
+        Il manifest (fingerprint degli Embeddings) viene scritto per ultimo
+        :param path: directory di destinazione
+        """
+
+        os.makedirs(path, exist_ok=True)
+        remove_manifest(path)
+        np.save(os.path.join(path, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'rows.npy'), self.rows)
+        write_manifest(path, fingerprint(self.embeddings.matrix))
+
+    @classmethod
+    def load(cls, path, embeddings, nprobe=8):
+        """
+        :param path: directory dell'indice (gli array sono memory-mapped)
+        :param embeddings: Embeddings da cui l'indice è stato costruito
+        :return: AnnIndex
+        :raise ValueError: se l'indice è stato costruito da altri Embeddings
+        """
+
+        if read_manifest(path) != fingerprint(embeddings.matrix):
+            raise ValueError('the index in {0} was not built from these embeddings'.format(path))
+
+        centroids = np.load(os.path.join(path, 'centroids.npy'))
+        indptr = np.load(os.path.join(path, 'indptr.npy'), mmap_mode='r')
+        rows = np.load(os.path.join(path, 'rows.npy'), mmap_mode='r')
+        return cls(embeddings, centroids, indptr, rows, nprobe)
+
+    @classmethod
+    def load_or_build(cls, path, embeddings, nprobe=8):
+        """
+        :param path: directory dell'indice
+        :param embeddings: Embeddings
+        :return: l'indice salvato in path, se non esiste (o è stato costruito da altri Embeddings)
+                 viene costruito e salvato
+        """
+
+        if read_manifest(path) == fingerprint(embeddings.matrix):
+            return cls.load(path, embeddings, nprobe)
+
+        index = cls.build(embeddings, nprobe=nprobe)
+        index.save(path)
+        return index
+
+    def candidates(self, vector, nprobe=None):
+        """
+        :param vector: vettore normalizzato della query
+        :param nprobe: numero di cluster visitati (default self.nprobe)
+        :return: righe degli Embeddings dei cluster con centroide più vicino alla query
+        """
+
+        if nprobe is None:
+            nprobe = self.nprobe
+
+        probes = top_k(self.centroids @ vector, nprobe)
+        return np.concatenate([self.rows[self.indptr[c]:self.indptr[c + 1]] for c in probes])
+
+    def search(self, vector, k=10, nprobe=None, exclude=None):
+        """
+        :param vector: vettore normalizzato della query
+        :param k: numero di sensi restituiti
+        :param nprobe: numero di cluster visitati (default self.nprobe)
+        :param exclude: riga da escludere dai risultati (e.g il senso della query)
+        :return: lista di (BabelID, cosine similarity) dei k sensi più simili (approssimata)
+        """
+
+        rows = self.candidates(vector, nprobe)
+        if exclude is not None:
+            rows = rows[rows != exclude]
+        return self.results(rows, self.embeddings.matrix[rows] @ vector, k)
+
+    def brute_force(self, vector, k=10, exclude=None):
+        """
+        :return: come search, confrontando la query con tutti i vettori (esatta)
+        """
+
+        scores = np.asarray(self.embeddings.matrix @ vector)
+        rows = np.arange(len(scores))
+        if exclude is not None:
+            rows = rows[rows != exclude]
+            scores = scores[rows]
+        return self.results(rows, scores, k)
+
+    def results(self, rows, scores, k):
+        """
+        :return: lista di (BabelID, score) dei k punteggi maggiori
+        """
+
+        best = top_k(scores, k)
+        return [(self.embeddings.ids[rows[i]], float(scores[i])) for i in best]
+
+    def most_similar(self, bn, k=10, nprobe=None):
+        """
+        :param bn: BabelID della query
+        :param k: numero di sensi restituiti
+        :return: lista di (BabelID, cosine similarity) dei k sensi più simili a bn (bn escluso)
+        :raise KeyError: se bn non è presente negli Embeddings
+        """
+
+        row = self.embeddings.row(bn)
+        if row < 0:
+            raise KeyError('unknown BabelID: {0}'.format(bn))
+        return self.search(self.embeddings.matrix[row], k, nprobe, exclude=row)
+
+    def benchmark(self, queries=100, k=10, nprobe=None, seed=0):
+        """
+        Confronta la ricerca approssimata con la ricerca esatta su sensi casuali
+        :param queries: numero di query
+        :param k: numero di sensi restituiti per query
+        :param nprobe: numero di cluster visitati (default self.nprobe)
+        :param seed: seme del generatore casuale
+        :return: dizionario {recall: recall@k medio, ann_ms: latenza media approssimata, brute_ms: latenza media esatta}
+        """
+
+        rng = np.random.default_rng(seed)
+        matrix = self.embeddings.matrix
+        sample = rng.choice(len(matrix), min(queries, len(matrix)), replace=False)
+
+        recall = 0
+        ann_time = 0
+        brute_time = 0
+        for row in sample:
+            vector = np.asarray(matrix[row])
+
+            start = time.perf_counter()
+            approx = self.search(vector, k, nprobe, exclude=row)
+            ann_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            exact = self.brute_force(vector, k, exclude=row)
+            brute_time += time.perf_counter() - start
+
+            if len(exact) > 0:
+                recall += len(set(bn for bn, _ in approx) & set(bn for bn, _ in exact)) / len(exact)
+
+        n = max(len(sample), 1)
+        return {'recall': recall / n, 'ann_ms': 1000 * ann_time / n, 'brute_ms': 1000 * brute_time / n}
@@ -0,0 +1,258 @@
+"""
+Il seguente modulo contiene i vettori Nasari (rappresentazione Embedded) in un'unica matrice float32
+con righe normalizzate (norma L2 = 1): la cosine similarity diventa un prodotto tra matrici
+Il file testuale viene convertito una sola volta in formato binario (.npy memory-mapped)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import os
+import numpy as np
+
+from src.string_table import StringTable, sorted_strings
+from src.string_table import source_manifest, read_manifest, write_manifest, remove_manifest
+
+
+class Embeddings:
+    """
+    BabelID e termini sono StringTable: nel formato binario sono memory-mapped e decodificati solo quando servono
+
+    Attributes:
+        ids: BabelID (uno per riga)
+        words: termini inglesi corrispondenti (uno per riga)
+        sorted_ids: BabelID distinti, ordinati (ricerca binaria)
+        sorted_rows: riga di ogni BabelID di sorted_ids
+        matrix: matrice float32 dei vettori normalizzati (una riga per BabelID)
+        rows: ricerche già eseguite {BabelID: riga, -1 se assente}
+    """
+
+    def __init__(self, ids, words, sorted_ids, sorted_rows, matrix):
+        self.ids = ids
+        self.words = words
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+        self.matrix = matrix
+        self.rows = {}
+
+    @classmethod
+    def from_text(cls, path, store=None, batch=65536):
+        """
+        Parsifica il file di input NASARI (rappresentazione Embedded), una riga "BabelID__word v1 v2 ..." per senso
+        Il file viene letto due volte: la prima ricava vocabolario e dimensioni, la seconda scrive i vettori
+        direttamente nella matrice (nessuna lista intermedia)
+        :param path: percorso del file Nasari
+        :param store: directory in cui scrivere la matrice (matrix.npy memory-mapped), None per tenerla in memoria
+        :param batch: righe normalizzate alla volta
+        :return: Embeddings
+        """
+
+        ids = []
+        words = []
+        dim = 0
+        with open(path, 'r', encoding="utf8") as file:
+            for line in file:
+                splits = line.split()
+                if len(splits) == 0:
+                    continue
+                k = splits[0].split("__")
+                ids.append(k[0])
+                words.append(k[1])
+                dim = max(dim, len(splits) - 1)
+
+        shape = (len(ids), dim)
+        if store is not None:
+            matrix = np.lib.format.open_memmap(os.path.join(store, 'matrix.npy'), mode='w+', dtype=np.float32,
+                                               shape=shape)
+        else:
+            matrix = np.empty(shape, dtype=np.float32)
+
+        with open(path, 'r', encoding="utf8") as file:
+            i = 0
+            for line in file:
+                splits = line.split()
+                if len(splits) == 0:
+                    continue
+                matrix[i] = np.array(splits[1:], dtype=np.float32)
+                i += 1
+
+        for start in range(0, len(matrix), batch):
+            matrix[start:start + batch] = normalize(matrix[start:start + batch])
+        if store is not None:
+            matrix.flush()
+
+        sorted_ids, sorted_rows = sorted_strings(ids)
+        return cls(StringTable.from_strings(ids), StringTable.from_strings(words), sorted_ids, sorted_rows, matrix)
+
+    def save(self, path):
+        """
+        :param path: directory di destinazione (una matrice già scritta in path da from_text non viene copiata)
+        """
+
+        os.makedirs(path, exist_ok=True)
+        matrix_path = os.path.join(path, 'matrix.npy')
+        if not (isinstance(self.matrix, np.memmap) and os.path.abspath(self.matrix.filename) ==
+                os.path.abspath(matrix_path)):
+            np.save(matrix_path, self.matrix)
+        np.save(os.path.join(path, 'sorted_rows.npy'), self.sorted_rows)
+        self.ids.save(path, 'ids')
+        self.words.save(path, 'words')
+        self.sorted_ids.save(path, 'sorted_ids')
+
+    @classmethod
+    def load(cls, path):
+        """
+        Nessun file viene parsificato: matrice, BabelID e termini sono memory-mapped
+        :param path: directory del formato binario
+        :return: Embeddings
+        """
+
+        matrix = np.load(os.path.join(path, 'matrix.npy'), mmap_mode='r')
+        sorted_rows = np.load(os.path.join(path, 'sorted_rows.npy'), mmap_mode='r')
+        return cls(StringTable.load(path, 'ids'), StringTable.load(path, 'words'), StringTable.load(path, 'sorted_ids'),
+                   sorted_rows, matrix)
+
+    @classmethod
+    def load_or_build(cls, path, source):
+        """
+        Il manifest della directory registra il file sorgente (percorso, dimensione, data di modifica):
+        se non corrisponde la conversione viene ripetuta
+        :param path: directory del formato binario
+        :param source: file Nasari testuale
+        :return: gli Embeddings salvati in path, se non esistono (o sono stati convertiti da un altro file)
+                 vengono convertiti da source e salvati
+        """
+
+        manifest = source_manifest(source)
+        if read_manifest(path) == manifest:
+            return cls.load(path)
+
+        os.makedirs(path, exist_ok=True)
+        remove_manifest(path)
+        embeddings = cls.from_text(source, path)
+        embeddings.save(path)
+        del embeddings
+        write_manifest(path, manifest)
+        return cls.load(path)
+
+    def row(self, bn):
+        """
+        :param bn: BabelID
+        :return: riga del senso, -1 se non presente (ricerca binaria, memorizzata)
+        """
+
+        row = self.rows.get(bn)
+        if row is None:
+            pos = self.sorted_ids.find(bn)
+            row = int(self.sorted_rows[pos]) if pos >= 0 else -1
+            self.rows[bn] = row
+        return row
+
+    def __contains__(self, bn):
+        return self.row(bn) >= 0
+
+    def __len__(self):
+        return len(self.sorted_ids)
+
+    def word(self, bn):
+        """
+        :param bn: BabelID
+        :return: termine inglese corrispondente
+        """
+
+        row = self.row(bn)
+        if row < 0:
+            raise KeyError(bn)
+        return self.words[row]
+
+    def vector(self, bn):
+        """
+        :param bn: BabelID
+        :return: vettore normalizzato del senso
+        """
+
+        row = self.row(bn)
+        if row < 0:
+            raise KeyError(bn)
+        return self.matrix[row]
+
+    def find(self, bn_list):
+        """
+        :param bn_list: lista di BabelID
+        :return: (BabelID presenti in Nasari, righe corrispondenti), nell'ordine di bn_list
+        """
+
+        found = [bn for bn in bn_list if bn in self]
+        return found, np.array([self.row(bn) for bn in found], dtype=np.int64)
+
+    def similarity_matrix(self, rows1, rows2):
+        """
+        :param rows1: righe dei sensi (e.g della parola 1)
+        :param rows2: righe dei sensi (e.g della parola 2)
+        :return: matrice len(rows1) x len(rows2) delle cosine similarity
+        """
+
+        return self.matrix[rows1] @ self.matrix[rows2].T
+
+    def best_pair(self, bn_list1, bn_list2):
+        """
+        Restituisce la coppia di sensi (BabelID) che massimizza la cosine similarity,
+        calcolando la similarità di tutte le coppie con un unico prodotto tra matrici
+        :param bn_list1: lista di babelID della parola 1
+        :param bn_list2: lista di babelID della parola 2
+        :return: la coppia di sensi, (None, None) se nessuna coppia ha similarità positiva
+        """
+
+        found1, rows1 = self.find(bn_list1)
+        found2, rows2 = self.find(bn_list2)
+        if len(found1) == 0 or len(found2) == 0:
+            return None, None
+
+        return best_cell(self.similarity_matrix(rows1, rows2), found1, found2)
+
+    def best_pairs(self, couples):
+        """
+        Come best_pair per tutte le coppie: i vettori dei sensi coinvolti sono letti una sola volta
+        e per ogni coppia si calcola solo il blocco delle similarità tra i suoi sensi
+        :param couples: lista di (lista di babelID della parola 1, lista di babelID della parola 2)
+        :return: lista delle coppie di sensi, (None, None) se nessuna coppia ha similarità positiva
+        """
+
+        found = [(self.find(bn_list1), self.find(bn_list2)) for bn_list1, bn_list2 in couples]
+        rows = np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] +
+                                        [r for pair in found for _, r in pair]))
+        vectors = np.asarray(self.matrix[rows])
+
+        senses = []
+        for (found1, rows1), (found2, rows2) in found:
+            if len(found1) == 0 or len(found2) == 0:
+                senses.append((None, None))
+                continue
+
+            cells = vectors[np.searchsorted(rows, rows1)] @ vectors[np.searchsorted(rows, rows2)].T
+            senses.append(best_cell(cells, found1, found2))
+        return senses
+
+
+def normalize(matrix):
+    """
+    :param matrix: matrice dei vettori (una riga per vettore)
+    :return: matrice con righe di norma L2 = 1 (i vettori nulli restano nulli)
+    """
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32)
+
+
+def best_cell(similarities, found1, found2):
+    """
+    :param similarities: matrice delle similarità tra found1 e found2
+    :param found1: BabelID delle righe
+    :param found2: BabelID delle colonne
+    :return: coppia di sensi con similarità massima (a parità, la prima in ordine di riga), (None, None) se <= 0
+    """
+
+    i, j = np.unravel_index(np.argmax(similarities), similarities.shape)
+    if similarities[i, j] > 0:
+        return found1[i], found2[j]
+    return None, None
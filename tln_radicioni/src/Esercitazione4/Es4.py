@@ -8,63 +8,26 @@ from optparse import OptionParser
 import sys
 from scipy.stats import pearsonr
 from scipy.stats import spearmanr
-import numpy as np
-import requests
-from sklearn.metrics.pairwise import cosine_similarity
 
-
-def get_gloss(sense):
-    """
-    Esegue chiamate a BabelNet per ricavare le glossa (in italiano) del BabelSynset
-    :param sense: BabelID del senso
-    :return: glossa corrispondente
-    """
-
-    global options
-
-    url = "https://babelnet.io/v5/getSynset"
-    params = {
-        'id': sense,
-        'key': options.key,
-        'targetLang': 'IT'
-    }
-
-    r = requests.get(url=url, params=params)
-    data = r.json()
-
-    if len(data["glosses"]) == 0:
-        return "GLOSS INESISTENTE"
-    else:
-        return data["glosses"][0]["gloss"]
+from src.Esercitazione4.AnnIndex import AnnIndex
+from src.Esercitazione4.Embeddings import Embeddings
+from src.Esercitazione4.Glosses import GlossFetcher, BABELNET_URL
 
 
 def parse_nasari():
     """
     Parsifica il file di input NASARI (rappresentazione Embedded)
-    Ritorna un dizionario che associa ad ogni BabelID il vettore Nasari corrispondente
-    e un dizionario lessicale che associa ad ogni BabelID il termine inglese corrispondente
-    :return: {babelId: [values]}, {babelID: word_en}
+    i vettori sono raccolti in un'unica matrice normalizzata, indicizzata per BabelID
+    (Embeddings.word associa ad ogni BabelID il termine inglese corrispondente)
+    con la directory del formato binario il file viene convertito alla prima esecuzione, poi caricato in memory-map
+    :return: Embeddings
     """
 
     global options
 
-    nasari = {}
-    babel_word_nasari = {}
-
-    with open(options.nasari, 'r', encoding="utf8") as file:
-        for line in file.readlines():
-            lineSplitted = line.split()
-            k = lineSplitted[0].split("__")
-            babel_word_nasari[k[0]] = k[1]
-            lineSplitted[0] = k[0]
-            i = 1
-            values = []
-            while i < len(lineSplitted):
-                values.append(float(lineSplitted[i]))
-                i += 1
-            nasari[lineSplitted[0]] = values
-
-    return nasari, babel_word_nasari
+    if options.store:
+        return Embeddings.load_or_build(options.store, options.nasari)
+    return Embeddings.from_text(options.nasari)
 
 
 def parse_italian_synset():
@@ -122,30 +85,41 @@ def compute_interrate(v1, v2):
     return means, pearsonr(v1, v2)[0], spearmanr(v1, v2)[0]
 
 
-def similarity_vectors(bn_list1, bn_list2, nasari_dict):
+def similarity_vectors(bn_list1, bn_list2, nasari):
     """
-    Calcola la similarità coseno tra 2 vettori Nasari (rappresentazione Embedded)
+    Calcola la similarità coseno tra i vettori Nasari (rappresentazione Embedded) dei sensi delle 2 parole
     Restituisce la coppia di sensi (BabelID) che massimizza tale similarità
     :param bn_list1: lista di babelID della parola 1
     :param bn_list2: lista di babelID della parola 2
-    :param nasari_dict: dizionario di NASARI
+    :param nasari: Embeddings Nasari
     :return: la coppia di sensi che massimizza la cosine similarity
     """
 
-    max_value = 0
-    senses = (None, None)
-    for bn1 in bn_list1:
-        for bn2 in bn_list2:
-            if bn1 in nasari_dict.keys() and bn2 in nasari_dict.keys():
-                v1 = nasari_dict[bn1]
-                v2 = nasari_dict[bn2]
-                n1 = np.array(v1).reshape(1, len(v1))  # trasforma array in un np.array (numpy array)
-                n2 = np.array(v2).reshape(1, len(v2))  # dimensione array: 1 x len(v)
-                t = cosine_similarity(n1, n2)[0][0]
-                if t > max_value:
-                    max_value = t
-                    senses = (bn1, bn2)
-    return senses
+    return nasari.best_pair(bn_list1, bn_list2)
+
+
+def explore(nasari):
+    """
+    Ricerca dei sensi più simili a options.query con l'indice approssimato
+    e (con options.benchmark) confronto di recall e latenza con la ricerca esatta
+    :param nasari: Embeddings Nasari
+    """
+
+    global options
+
+    if options.query is not None and options.query not in nasari:
+        print('Unknown BabelID: {0}'.format(options.query))
+        sys.exit(2)
+
+    index = AnnIndex.load_or_build(options.ann, nasari, options.nprobe)
+    if options.benchmark:
+        stats = index.benchmark(k=options.top)
+        print('recall@{0}: {1:.4f}, ann: {2:.3f} ms, brute force: {3:.3f} ms'.format(
+            options.top, stats['recall'], stats['ann_ms'], stats['brute_ms']))
+
+    if options.query is not None:
+        for bn, score in index.most_similar(options.query, options.top):
+            print('{0}\t{1}\t{2:.4f}'.format(bn, nasari.word(bn), score))
 
 
 if __name__ == "__main__":
@@ -154,6 +128,8 @@ if __name__ == "__main__":
 
     parser.add_option("-n", "--nasari", help='nasari file', action="store", type="string", dest="nasari",
                       default="../../input/mini_NASARI.tsv")
+    parser.add_option("-b", "--binary", help='nasari binary directory (empty to disable)', action="store",
+                      type="string", dest="store", default="../../cache/nasari-embed/")
     parser.add_option("-i", help='input annotation file', action="store", type="string", dest="annotation1",
                       default="../../input/annotation1.txt")
     parser.add_option("-u", help='input annotation file', action="store", type="string", dest="annotation2",
@@ -164,6 +140,24 @@ if __name__ == "__main__":
                       default="../../output/Es4/")
     parser.add_option("-k", "--key", help='BabelNet API key', action="store", type="string", dest="key",
                       default="4791c99c-76fc-4c75-92f7-845f8ebe46c6")
+    parser.add_option("--babelnet-url", help='BabelNet getSynset endpoint', action="store", type="string",
+                      dest="babelnet_url", default=BABELNET_URL)
+    parser.add_option("-g", "--gloss-cache", help='gloss cache file (empty to disable)', action="store",
+                      type="string", dest="gloss_cache", default="../../cache/glosses.sqlite")
+    parser.add_option("-w", "--workers", help='concurrent BabelNet requests', action="store", type="int",
+                      dest="workers", default="8")
+    parser.add_option("--offline", help='read glosses from the cache only', action="store_true", dest="offline",
+                      default=False)
+    parser.add_option("-a", "--ann", help='approximate nearest neighbour index directory', action="store",
+                      type="string", dest="ann", default="../../cache/nasari-ann/")
+    parser.add_option("-q", "--query", help='BabelID: print the most similar senses and exit', action="store",
+                      type="string", dest="query")
+    parser.add_option("-t", "--top", help='number of similar senses', action="store", type="int", dest="top",
+                      default="10")
+    parser.add_option("--nprobe", help='clusters visited by each query', action="store", type="int",
+                      dest="nprobe", default="8")
+    parser.add_option("--benchmark", help='compare the index with brute force search and exit',
+                      action="store_true", dest="benchmark", default=False)
 
     (options, args) = parser.parse_args()
 
@@ -171,7 +165,12 @@ if __name__ == "__main__":
         print("Missing mandatory parameters")
         sys.exit(2)
 
-    nasari_dict, babel_word_nasari = parse_nasari()
+    nasari = parse_nasari()
+
+    if options.query is not None or options.benchmark:
+        explore(nasari)
+        sys.exit(0)
+
     italian_senses_dict = parse_italian_synset()
 
     annotation1 = parse_input(options.annotation1)
@@ -192,16 +191,29 @@ if __name__ == "__main__":
 
     annotation = list(zip(c1, avg))
 
+    # coppie di sensi di tutte le coppie di parole, con un unico prodotto tra matrici
+    senses = nasari.best_pairs([(italian_senses_dict[key[0]], italian_senses_dict[key[1]]) for key, _ in annotation])
+
+    # glosse di tutti i sensi, richieste in parallelo (solo quelle non presenti in cache)
+    fetcher = GlossFetcher(options.key, options.gloss_cache or None, options.babelnet_url, workers=options.workers,
+                           offline=options.offline)
+    glosses = fetcher.get_all(s for pair in senses for s in pair if s is not None)
+    fetcher.close()
+
+    print('BabelNet: {0} calls, {1} failures'.format(fetcher.calls, fetcher.failures))
+    if fetcher.failures > 0:
+        print('Warning: {0} glosses not available, check the API key and the request limit ({1})'.format(
+            fetcher.failures, fetcher.last_error))
+
     with open(options.output + 'Es4.txt', "w", encoding="utf-8") as out:
-        for couple in annotation:
+        for couple, (s1, s2) in zip(annotation, senses):
             key = couple[0]
 
-            (s1, s2) = similarity_vectors(italian_senses_dict[key[0]], italian_senses_dict[key[1]], nasari_dict)
             out.write(str(key) + "\n")
             if s1 is not None and s2 is not None:
                 out.write(str((s1, s2)) + "\n")
-                gloss1 = get_gloss(s1)
-                gloss2 = get_gloss(s2)
+                gloss1 = glosses[s1] or "GLOSS NON DISPONIBILE"
+                gloss2 = glosses[s2] or "GLOSS NON DISPONIBILE"
                 out.write(gloss1 + "\n")
                 out.write(gloss2 + "\n")
             else:
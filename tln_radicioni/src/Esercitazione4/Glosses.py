@@ -0,0 +1,158 @@
+"""
+Il seguente modulo contiene il recupero delle glosse dei BabelSynset da BabelNet:
+le richieste sono eseguite in parallelo su una sessione HTTP condivisa (connection pooling e retry)
+e le glosse sono salvate in una cache persistente SQLite (in modalità offline si usa solo la cache)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sqlite3
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BABELNET_URL = "https://babelnet.io/v5/getSynset"
+NO_GLOSS = "GLOSS INESISTENTE"  # il synset non ha glosse nella lingua richiesta
+
+
+class GlossFetcher:
+    """
+    Cache {BabelID: glossa} davanti alle chiamate a BabelNet
+
+    Attributes:
+        key: BabelNet API key
+        url: endpoint getSynset (e.g un server locale al posto di BabelNet)
+        lang: lingua delle glosse
+        workers: numero massimo di richieste contemporanee
+        timeout: timeout di ogni richiesta (secondi)
+        offline: True se le glosse vengono lette solo dalla cache (nessuna chiamata di rete)
+        glosses: glosse in memoria {BabelID: glossa}
+        calls: numero di chiamate a BabelNet eseguite
+        failures: numero di sensi per cui la chiamata è fallita (non salvati in cache)
+        last_error: descrizione dell'ultimo errore (e.g 403 per API key non valida), None se nessuna chiamata è fallita
+    """
+
+    def __init__(self, key, path=None, url=BABELNET_URL, lang='IT', workers=8, retries=3, backoff=0.5, timeout=10,
+                 offline=False):
+        """
+        :param path: percorso del database SQLite (None se la cache non è persistente)
+        :param retries: numero di tentativi per errori di connessione e risposte 429/5xx
+        :param backoff: fattore di attesa esponenziale tra i tentativi
+        """
+
+        self.key = key
+        self.url = url
+        self.lang = lang
+        self.workers = workers
+        self.timeout = timeout
+        self.offline = offline
+        self.glosses = {}
+        self.calls = 0
+        self.failures = 0
+        self.last_error = None
+        self.db = None
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        if path is not None:
+            cache_dir = os.path.dirname(path)
+            if cache_dir != '':
+                os.makedirs(cache_dir, exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=60)
+            self.db.execute('CREATE TABLE IF NOT EXISTS gloss (lang TEXT, sense TEXT, gloss TEXT, '
+                            'PRIMARY KEY (lang, sense))')
+            self.db.commit()
+
+    def fetch(self, sense):
+        """
+        Esegue la chiamata a BabelNet per ricavare la glossa del BabelSynset
+        :param sense: BabelID del senso
+        :return: glossa corrispondente (NO_GLOSS se non esiste), None se la chiamata fallisce
+        """
+
+        params = {
+            'id': sense,
+            'key': self.key,
+            'targetLang': self.lang
+        }
+
+        try:
+            r = self.session.get(url=self.url, params=params, timeout=self.timeout)
+            r.raise_for_status()  # e.g 401/403 per API key non valida
+            data = r.json()
+        except (requests.RequestException, ValueError) as e:
+            self.last_error = '{0}: {1}'.format(type(e).__name__, e)
+            return None
+
+        if "glosses" not in data:  # e.g limite giornaliero di richieste superato
+            self.last_error = str(data)
+            return None
+        if len(data["glosses"]) == 0:
+            return NO_GLOSS
+        return data["glosses"][0]["gloss"]
+
+    def lookup(self, senses):
+        """
+        :param senses: BabelID da cercare nella cache persistente
+        :return: glosse trovate {BabelID: glossa}
+        """
+
+        if self.db is None or len(senses) == 0:
+            return {}
+
+        found = {}
+        senses = list(senses)
+        for i in range(0, len(senses), 500):  # limite dei parametri di SQLite
+            chunk = senses[i:i + 500]
+            rows = self.db.execute('SELECT sense, gloss FROM gloss WHERE lang = ? AND sense IN ({0})'.format(
+                ', '.join('?' * len(chunk))), [self.lang] + chunk).fetchall()
+            found.update(rows)
+        return found
+
+    def get_all(self, senses):
+        """
+        Le glosse non presenti in cache vengono richieste in parallelo (al più workers richieste contemporanee)
+        :param senses: iterabile di BabelID
+        :return: dizionario {BabelID: glossa}, None per i sensi senza glossa disponibile
+        """
+
+        senses = list(dict.fromkeys(senses))
+        missing = [s for s in senses if s not in self.glosses]
+        self.glosses.update(self.lookup(missing))
+        missing = [s for s in missing if s not in self.glosses]
+
+        if len(missing) > 0 and not self.offline:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                fetched = dict(zip(missing, executor.map(self.fetch, missing)))
+            self.calls += len(missing)
+
+            fetched = {s: g for s, g in fetched.items() if g is not None}
+            self.failures += len(missing) - len(fetched)
+            self.glosses.update(fetched)
+            if self.db is not None and len(fetched) > 0:
+                self.db.executemany('INSERT OR REPLACE INTO gloss VALUES (?, ?, ?)',
+                                    [(self.lang, s, g) for s, g in fetched.items()])
+                self.db.commit()
+
+        return {s: self.glosses.get(s) for s in senses}
+
+    def get(self, sense):
+        """
+        :param sense: BabelID del senso
+        :return: glossa corrispondente, None se non disponibile
+        """
+
+        return self.get_all([sense])[sense]
+
+    def close(self):
+        self.session.close()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,110 @@
+"""
+Normalizer module
+text normalization shared by every bag of words implementation:
+tokenization, stop words and punctuation removal, lemmatization
+
+Shared module: tln_radicioni/src/normalizer.py and tln_dicaro/src/normalizer.py must stay identical
+(check with python check_shared.py from the repository root)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+import nltk
+from nltk.corpus import stopwords
+
+PUNCT = frozenset({',', ';', '(', ')', '{', '}', ':', '?', '!'})
+
+
+class Normalizer:
+    """
+    Normalization pipeline, the setup (stop words, lemmatizer) is done once
+
+    Attributes:
+        stop_words: set of english stop words
+        punct: set of punctuation tokens to remove
+        lower: True if the text is lowercased before tokenization
+        wnl: WordNet lemmatizer
+        lemmas: memoized lemmatization {token: lemma}
+    """
+
+    def __init__(self, punct=PUNCT, lower=False):
+        self.stop_words = set(stopwords.words('english'))
+        self.punct = frozenset(punct)
+        self.lower = lower
+        self.wnl = nltk.WordNetLemmatizer()
+        self.lemmas = {}
+
+    def tokenize(self, text):
+        """
+        :param text: string
+        :return: list of tokens
+        """
+
+        if self.lower:
+            text = text.lower()
+        return nltk.word_tokenize(text)
+
+    def filter(self, tokens):
+        """
+        :param tokens: list of tokens
+        :return: tokens without stop words and punctuation
+        """
+
+        return [t for t in tokens if t not in self.stop_words and t not in self.punct]
+
+    def lemmatize(self, token):
+        """
+        :param token: token
+        :return: lemma of the token (memoized)
+        """
+
+        lemma = self.lemmas.get(token)
+        if lemma is None:
+            lemma = self.wnl.lemmatize(token)
+            self.lemmas[token] = lemma
+        return lemma
+
+    def bag_of_tokens(self, tokens):
+        """
+        :param tokens: list of tokens
+        :return: bag of words (set of lemmas)
+        """
+
+        return set(self.lemmatize(t) for t in self.filter(tokens))
+
+    def bag_of_word(self, text):
+        """
+        :param text: string
+        :return: bag of words (set of lemmas)
+        """
+
+        return self.bag_of_tokens(self.tokenize(text))
+
+    def batch(self, texts):
+        """
+        Normalizes many texts at once, each distinct token is lemmatized only once
+
+        :param texts: iterable of strings
+        :return: list of bags of words, one for each text
+        """
+
+        filtered = [self.filter(self.tokenize(text)) for text in texts]
+        for token in set(t for tokens in filtered for t in tokens):
+            self.lemmatize(token)
+        return [set(self.lemmas[t] for t in tokens) for tokens in filtered]
+
+
+_normalizers = {}  # istanze condivise {(punct, lower): Normalizer}
+
+
+def get_normalizer(punct=PUNCT, lower=False):
+    """
+    :param punct: set of punctuation tokens to remove
+    :param lower: True if the text has to be lowercased
+    :return: shared Normalizer with the given configuration (created at first use)
+    """
+
+    key = (frozenset(punct), lower)
+    if key not in _normalizers:
+        _normalizers[key] = Normalizer(punct, lower)
+    return _normalizers[key]
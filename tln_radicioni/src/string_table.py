@@ -0,0 +1,167 @@
+"""
+String table module
+strings stored as one UTF-8 buffer plus offsets (two .npy arrays): the table is memory-mapped,
+strings are decoded only when accessed and a sorted table is searched without building a dictionary;
+the manifest records the source file a binary format was converted from
+
+Shared module: tln_radicioni/src/string_table.py and tln_dicaro/src/string_table.py must stay identical
+(check with python check_shared.py from the repository root)
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from bisect import bisect_left
+import json
+import os
+import numpy as np
+
+
+class StringTable:
+    """
+    The string i is blob[offsets[i]:offsets[i + 1]] (UTF-8)
+
+    Attributes:
+        blob: UTF-8 bytes of all the strings (uint8)
+        offsets: string offsets (len + 1)
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        :param strings: list of strings
+        :return: StringTable
+        """
+
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def save(self, path, name):
+        """
+        :param path: destination directory
+        :param name: table name (prefix of the files)
+        """
+
+        np.save(os.path.join(path, name + '_blob.npy'), self.blob)
+        np.save(os.path.join(path, name + '_offsets.npy'), self.offsets)
+
+    @classmethod
+    def load(cls, path, name):
+        """
+        :param path: directory of the table (arrays are memory-mapped)
+        :param name: table name
+        :return: StringTable
+        """
+
+        blob = np.load(os.path.join(path, name + '_blob.npy'), mmap_mode='r')
+        offsets = np.load(os.path.join(path, name + '_offsets.npy'), mmap_mode='r')
+        return cls(blob, offsets)
+
+    def raw(self, i):
+        """
+        :return: UTF-8 bytes of the string i
+        """
+
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        return self.raw(i).decode('utf-8')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def find(self, string):
+        """
+        Binary search, the table must be sorted by UTF-8 bytes (see sorted_strings)
+        :param string: string
+        :return: position of the string, -1 if not present
+        """
+
+        key = string.encode('utf-8')
+        pos = bisect_left(_RawView(self), key)
+        if pos < len(self) and self.raw(pos) == key:
+            return pos
+        return -1
+
+
+class _RawView:
+    """
+    Sequence of the UTF-8 bytes of a StringTable (for bisect)
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, i):
+        return self.table.raw(i)
+
+    def __len__(self):
+        return len(self.table)
+
+
+def sorted_strings(strings):
+    """
+    :param strings: list of strings
+    :return: (StringTable of the distinct strings sorted by UTF-8 bytes, position in strings of each of them)
+             for repeated strings the position is the last occurrence
+    """
+
+    last = {}
+    for i, s in enumerate(strings):
+        last[s] = i
+    keys = sorted(last, key=lambda s: s.encode('utf-8'))
+    return StringTable.from_strings(keys), np.array([last[s] for s in keys], dtype=np.int64)
+
+
+def source_manifest(source, **params):
+    """
+    :param source: source file of a binary format
+    :param params: conversion parameters (e.g separator)
+    :return: manifest identifying the source file (path, size, modification time) and the parameters
+    """
+
+    stat = os.stat(source)
+    manifest = {'source': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    manifest.update(params)
+    return manifest
+
+
+def read_manifest(path):
+    """
+    :param path: directory of a binary format
+    :return: saved manifest, None if not present
+    """
+
+    try:
+        with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path, manifest):
+    """
+    The manifest is written last: a directory with a partial conversion has no manifest
+    :param path: directory of a binary format
+    :param manifest: manifest (json serializable)
+    """
+
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as out:
+        json.dump(manifest, out)
+
+
+def remove_manifest(path):
+    """
+    :param path: directory of a binary format (invalidated before being rewritten)
+    """
+
+    if os.path.exists(os.path.join(path, 'manifest.json')):
+        os.remove(os.path.join(path, 'manifest.json'))
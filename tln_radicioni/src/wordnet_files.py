@@ -0,0 +1,37 @@
+"""
+WordNet files module
+nltk keeps the WordNet data files open and reads them with seek + readline:
+a process created with fork inherits the open files of the parent and shares their offset in the kernel,
+so concurrent reads of the workers return wrong lines (wrong synsets or offset assertion errors)
+The version key identifies the installed WordNet for the indices built from it
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from nltk.corpus import wordnet as wn
+from nltk.corpus.util import LazyCorpusLoader
+
+
+def reset_wordnet_files():
+    """
+    Closes the WordNet data files inherited from the parent process (to be called in the worker initializer),
+    nltk reopens them privately at the next lookup
+    """
+
+    if isinstance(wn, LazyCorpusLoader):  # WordNet not loaded yet by the parent process
+        return
+
+    data_files = wn._data_file_map
+    for file in data_files.values():
+        if file is not None:
+            file.close()
+    data_files.clear()
+
+
+def wordnet_key():
+    """
+    :return: key identifying the installed WordNet (version and size of the data files)
+    """
+
+    sizes = [str(wn.abspath('data.' + pos).file_size()) for pos in ('noun', 'verb', 'adj', 'adv')]
+    return wn.get_version() + '-' + '-'.join(sizes)
@@ -0,0 +1,135 @@
+"""
+Test di GlossFetcher con un server getSynset locale (nessuna chiamata a BabelNet)
+Esecuzione dalla directory tln_radicioni: python -m unittest discover tests
+"""
+
+__author__ = 'Davide Giosa, Roger Ferrod, Simone Cullino'
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import os
+import tempfile
+import threading
+import unittest
+from urllib.parse import urlparse, parse_qs
+
+from src.Esercitazione4.Glosses import GlossFetcher, NO_GLOSS
+
+KEY = 'test-key'
+GLOSSES = {
+    'bn:00000001n': [{'gloss': 'prima glossa'}, {'gloss': 'seconda glossa'}],
+    'bn:00000002n': [{'gloss': 'glossa con accenti: città'}],
+    'bn:00000003n': []
+}
+
+
+class GetSynsetHandler(BaseHTTPRequestHandler):
+    """
+    getSynset minimale: 403 per una key diversa da KEY, 500 per bn:error, glosse da GLOSSES
+    """
+
+    requests = []  # id richiesti (in ordine di arrivo)
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        sense = params['id'][0]
+        GetSynsetHandler.requests.append(sense)
+
+        if params['key'][0] != KEY:
+            self.reply(403, {'message': 'Your key is not valid'})
+        elif sense == 'bn:error':
+            self.reply(500, {'message': 'Internal error'})
+        elif sense not in GLOSSES:
+            self.reply(200, {'message': 'Synset not found'})
+        else:
+            self.reply(200, {'glosses': GLOSSES[sense]})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class GlossFetcherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), GetSynsetHandler)
+        cls.url = 'http://127.0.0.1:{0}/getSynset'.format(cls.server.server_port)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        GetSynsetHandler.requests = []
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.dir.name, 'glosses.sqlite')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def fetcher(self, key=KEY, **kwargs):
+        fetcher = GlossFetcher(key, self.cache, self.url, retries=0, timeout=5, **kwargs)
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+    def test_get_all(self):
+        fetcher = self.fetcher()
+        glosses = fetcher.get_all(['bn:00000001n', 'bn:00000002n', 'bn:00000003n', 'bn:00000001n'])
+
+        self.assertEqual(glosses, {'bn:00000001n': 'prima glossa', 'bn:00000002n': 'glossa con accenti: città',
+                                   'bn:00000003n': NO_GLOSS})
+        self.assertEqual(sorted(GetSynsetHandler.requests), ['bn:00000001n', 'bn:00000002n', 'bn:00000003n'])
+        self.assertEqual((fetcher.calls, fetcher.failures, fetcher.last_error), (3, 0, None))
+
+    def test_cache(self):
+        self.fetcher().get_all(['bn:00000001n', 'bn:00000003n'])
+        GetSynsetHandler.requests = []
+
+        fetcher = self.fetcher()
+        self.assertEqual(fetcher.get('bn:00000001n'), 'prima glossa')
+        self.assertEqual(fetcher.get('bn:00000003n'), NO_GLOSS)
+        self.assertEqual(fetcher.get('bn:00000002n'), 'glossa con accenti: città')
+        self.assertEqual(GetSynsetHandler.requests, ['bn:00000002n'])
+        self.assertEqual(fetcher.calls, 1)
+
+    def test_offline(self):
+        self.fetcher().get_all(['bn:00000001n'])
+        GetSynsetHandler.requests = []
+
+        fetcher = self.fetcher(offline=True)
+        self.assertEqual(fetcher.get_all(['bn:00000001n', 'bn:00000002n']),
+                         {'bn:00000001n': 'prima glossa', 'bn:00000002n': None})
+        self.assertEqual(GetSynsetHandler.requests, [])
+        self.assertEqual(fetcher.calls, 0)
+
+    def test_invalid_key(self):
+        fetcher = self.fetcher(key='wrong-key')
+        self.assertEqual(fetcher.get_all(['bn:00000001n', 'bn:00000002n']),
+                         {'bn:00000001n': None, 'bn:00000002n': None})
+        self.assertEqual((fetcher.calls, fetcher.failures), (2, 2))
+        self.assertIn('403', fetcher.last_error)
+
+        # le chiamate fallite non vengono salvate in cache
+        self.assertEqual(self.fetcher().get('bn:00000001n'), 'prima glossa')
+
+    def test_failures(self):
+        fetcher = self.fetcher()
+        self.assertEqual(fetcher.get_all(['bn:error', 'bn:missing', 'bn:00000001n']),
+                         {'bn:error': None, 'bn:missing': None, 'bn:00000001n': 'prima glossa'})
+        self.assertEqual((fetcher.calls, fetcher.failures), (3, 2))
+        self.assertIsNotNone(fetcher.last_error)
+
+
+if __name__ == '__main__':
+    unittest.main()